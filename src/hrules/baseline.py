@@ -0,0 +1,108 @@
+# baseline.py
+import hashlib
+import re
+from collections import Counter
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Set, Tuple
+
+from hrules.scanner import classify_violation
+from hrules.report import read_json_report
+
+LOCATION_PATTERN = re.compile(r"\b(?:page|p)\s*(\d+)", re.IGNORECASE)
+# Grouped findings (scanner.FindingGroups) carry an occurrence count, a page list
+# (scanner.format_pages) and the lowest ratio seen.
+COUNT_PATTERN = re.compile(r"\((\d+) (?:occurrences|spans)\)")
+PAGES_PATTERN = re.compile(r"\bpages? (\d+(?:-\d+)?(?:, (?:\d+(?:-\d+)?|\+\d+ more))*)")
+RATIO_PATTERN = re.compile(r"\(ratio [\d.]+\)")
+NEW_PREFIX = "NEW: "
+RESOLVED_PREFIX = "RESOLVED: "
+
+
+def is_grouped(violation: str) -> bool:
+    return COUNT_PATTERN.search(violation) is not None
+
+
+def normalize_finding(violation: str) -> str:
+    """Whitespace/case-folded text; grouped lines also lose their count, page list and ratio."""
+    text = violation
+    if is_grouped(text):
+        text = RATIO_PATTERN.sub("", PAGES_PATTERN.sub("pages", COUNT_PATTERN.sub("", text)))
+    return " ".join(text.split()).lower()
+
+
+def finding_location(violation: str) -> str:
+    if is_grouped(violation):
+        return ""  # grouped: pages are members, see finding_members
+    m = LOCATION_PATTERN.search(violation)
+    return f"page {m.group(1)}" if m else ""
+
+
+def finding_members(violation: str) -> List[str]:
+    """Locations a finding covers: one for a plain line; every listed page plus every
+    occurrence for a grouped line, so a group that spreads or grows has new members."""
+    m = COUNT_PATTERN.search(violation)
+    if m is None:
+        return [finding_location(violation)]
+    members = [f"#{i}" for i in range(int(m.group(1)))]
+    pages = PAGES_PATTERN.search(violation)
+    for part in (pages.group(1).split(", ") if pages else []):
+        if part.startswith("+"):
+            members.extend(f"more {i}" for i in range(int(part[1:].split()[0])))
+        else:
+            first, _, last = part.partition("-")
+            members.extend(f"page {p}" for p in range(int(first), int(last or first) + 1))
+    return members
+
+
+def fingerprint(path: str, violation: str, occurrence: int = 0, location: str = None) -> bytes:
+    """Stable 16-byte id from (path, kind, location, normalized text, nth repeat in the file)."""
+    kind, _ = classify_violation(violation)
+    location = finding_location(violation) if location is None else location
+    key = "\0".join([path, kind, location, normalize_finding(violation), str(occurrence)])
+    return hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+
+
+def iter_fingerprints(pairs: Iterable[Tuple[Path, Dict[str, List[str]]]]) -> Iterator[Tuple[List[bytes], Path, str]]:
+    """(fingerprints, path, violation) per violation, one fingerprint per member location;
+    identical lines in a file get distinct ids."""
+    for path, res in pairs:
+        seen = Counter()
+        for violation in res.get("violations", []):
+            norm = normalize_finding(violation)
+            fps = [fingerprint(str(path), violation, seen[norm], member) for member in finding_members(violation)]
+            yield fps, path, violation
+            seen[norm] += 1
+
+
+def diff_against_baseline(pairs: List[Tuple[Path, Dict[str, List[str]]]], baseline_path: Path):
+    """Split findings into new/resolved/unchanged against a JSON-lines baseline report.
+
+    A line is new if any of its member fingerprints is missing from the baseline, and
+    resolved if any baseline member is gone now. The baseline is streamed twice and only
+    fingerprints are kept in memory, so this is linear in the number of findings.
+    Returns (new_pairs, resolved_pairs, unchanged_count). Raises ValueError when the
+    baseline is not a JSON-lines report.
+    """
+    base: Set[bytes] = {fp for fps, _, _ in iter_fingerprints(read_json_report(baseline_path)) for fp in fps}
+
+    current: Set[bytes] = set()
+    new_by_path: Dict[Path, Dict[str, List[str]]] = {}
+    unchanged = 0
+    for path, res in pairs:
+        fresh = []
+        for fps, _, violation in iter_fingerprints([(path, res)]):
+            current.update(fps)
+            if all(fp in base for fp in fps):
+                unchanged += 1
+            else:
+                fresh.append(NEW_PREFIX + violation)
+        if fresh:
+            new_by_path[path] = {"violations": fresh, "notes": list(res.get("notes", []))}
+
+    resolved_by_path: Dict[Path, Dict[str, List[str]]] = {}
+    for fps, path, violation in iter_fingerprints(read_json_report(baseline_path)):
+        if not all(fp in current for fp in fps):
+            resolved_by_path.setdefault(path, {"violations": [], "notes": []})["violations"].append(
+                RESOLVED_PREFIX + violation)
+
+    return list(new_by_path.items()), list(resolved_by_path.items()), unchanged
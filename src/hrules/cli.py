@@ -1,44 +1,304 @@
 # cli.py
 import sys
 from pathlib import Path
-from typing import List, Tuple, Dict
-from hrules.scanner import scan_file, scan_directory
-from hrules.report import format_block, write_txt_report
+from typing import List, Tuple, Dict, Optional
+from hrules.report import format_block, write_report
+from hrules.service import scan_via_service
+# The scanner and the modules built on it (shards, watch, store, baseline) pull in
+# PyMuPDF, python-docx, Tesseract and numpy; they are imported where they are used
+# so that --client, which only talks to the service, starts fast.
 
 DEFAULT_REPORT = "hrules_report.txt"
 
+USAGE = """Usage: hrules <file_or_directory> [--out report.txt] [--pdf-background] [--fail-fast [low|medium|high]]
+                                    [--detail summary|full]
+                                    [--store results.db] [--json results.json] [--baseline previous.json]
+       hrules <directory> --shard i/N [--checkpoint partial.jsonl]
+       hrules merge <partial.jsonl>... [--out report.txt]
+       hrules --watch <directory> [--out report.txt] [--state state.json] [--poll]
+       hrules serve [--host 127.0.0.1] [--port 8765 | --socket path] [--workers N] [--token-file path]
+                    [--pdf-background] [--fail-fast [low|medium|high]] [--detail summary|full]
+       hrules --client <file_or_directory> [--port 8765 [--token-file path] | --socket path]
+                                           [--out report.txt]
+       hrules query <results.db> [--kind K] [--type .docx] [--path PREFIX] [--severity S]
+                                 [--count [kind|severity|type]] [--notes] [--out report.txt|.pdf|.json]"""
 
-def main():
-    if len(sys.argv) < 2:
-        print("Usage: hrules <file_or_directory> [--out report.txt]")
+VALUE_FLAGS = {"--out", "--shard", "--checkpoint", "--state", "--host", "--port", "--socket", "--workers",
+               "--store", "--kind", "--type", "--path", "--severity", "--json", "--baseline",
+               "--detail", "--token-file"}
+# Flags whose value may be omitted, with the values they accept
+# (--fail-fast repeats scanner.SEVERITIES so parsing does not import the scanner)
+OPTIONAL_VALUE_FLAGS = {"--fail-fast": ("low", "medium", "high"), "--count": ("kind", "severity", "type")}
+
+
+def _option(args: List[str], flag: str):
+    """Value following flag, None if absent; exits on a dangling flag."""
+    if flag not in args:
+        return None
+    try:
+        return args[args.index(flag) + 1]
+    except IndexError:
+        print(f"Invalid {flag} usage.\n{USAGE}")
+        sys.exit(1)
+
+
+def _optional_value(args: List[str], flag: str, default: str):
+    """Value after an OPTIONAL_VALUE_FLAGS flag, default when omitted, None if absent."""
+    if flag not in args:
+        return None
+    i = args.index(flag)
+    if i + 1 < len(args) and args[i + 1] in OPTIONAL_VALUE_FLAGS[flag]:
+        return args[i + 1]
+    return default
+
+
+def _positionals(args: List[str]) -> List[str]:
+    out, skip = [], False
+    for prev, a in zip([None] + args, args):
+        if skip:
+            skip = False
+        elif a in VALUE_FLAGS:
+            skip = True
+        elif a in OPTIONAL_VALUE_FLAGS.get(prev, ()):
+            pass
+        elif not a.startswith("--"):
+            out.append(a)
+    return out
+
+
+def _store_results(pairs: List[Tuple[Path, Dict]], args: List[str]):
+    db = _option(args, "--store")
+    if db:
+        from hrules.store import open_store, save_results
+        conn = open_store(Path(db))
+        save_results(conn, pairs)
+        conn.close()
+        print(f"[+] Results stored in {db}")
+
+
+def _apply_baseline(pairs: List[Tuple[Path, Dict]], args: List[str]) -> List[Tuple[Path, Dict]]:
+    """Save the full results (--json) and, with --baseline, return only the delta."""
+    full_json = _option(args, "--json")
+    baseline = _option(args, "--baseline")
+    if not baseline:
+        if full_json:
+            write_report(pairs, Path(full_json))
+        return pairs
+    if not Path(baseline).exists():
+        print(f"[!] Baseline not found: {baseline}")
+        sys.exit(1)
+    from hrules.baseline import diff_against_baseline
+    # Diff before saving, so --json may overwrite the baseline it was compared to
+    try:
+        new, resolved, unchanged = diff_against_baseline(pairs, Path(baseline))
+    except (ValueError, KeyError, TypeError):
+        print(f"[!] Baseline {baseline} is not a JSON report; pass a file written with --json")
+        sys.exit(1)
+    if full_json:
+        write_report(pairs, Path(full_json))
+    new_count = sum(len(r["violations"]) for _, r in new)
+    resolved_count = sum(len(r["violations"]) for _, r in resolved)
+    print(f"[+] Baseline {baseline}: {new_count} new, {resolved_count} resolved, {unchanged} unchanged",
+          file=sys.stderr)
+    return new + resolved
+
+
+def query_main(args: List[str]):
+    from hrules import scanner
+    from hrules.store import open_store, query_findings, count_findings
+    targets = _positionals(args)
+    if not targets or not Path(targets[0]).exists():
+        print(f"[!] Result store not found.\n{USAGE}")
+        sys.exit(1)
+    severity = _option(args, "--severity")
+    if severity and severity not in scanner.SEVERITIES:
+        print(f"[!] --severity must be one of {', '.join(scanner.SEVERITIES)}")
+        sys.exit(1)
+    filters = {"kind": _option(args, "--kind"), "file_type": _option(args, "--type"),
+               "path_prefix": _option(args, "--path"), "severity": severity}
+    conn = open_store(Path(targets[0]))
+    group_by = _optional_value(args, "--count", "kind")
+    if group_by:
+        for key, count in count_findings(conn, group_by, **filters):
+            print(f"{count:>10}  {key}")
+        sys.exit(0)
+    pairs = query_findings(conn, include_notes="--notes" in args, **filters)
+    out = _option(args, "--out")
+    if out:
+        write_report(pairs, Path(out))
+        print(f"[+] {sum(len(r['violations']) for _, r in pairs)} finding(s) in {len(pairs)} file(s) "
+              f"exported to {out}")
+    else:
+        for p, res in pairs:
+            print(format_block(p, res))
+    sys.exit(0)
+
+
+def merge_main(args: List[str]):
+    from hrules.shards import merge_partials
+    out = Path(_option(args, "--out") or DEFAULT_REPORT)
+    partials = [Path(a) for a in _positionals(args)]
+    if not partials:
+        print(USAGE)
+        sys.exit(1)
+    missing = [str(p) for p in partials if not p.exists()]
+    if missing:
+        print(f"[!] Partial result files not found: {', '.join(missing)}")
+        sys.exit(1)
+    pairs = merge_partials(partials)
+    write_report(pairs, out)
+    _store_results(pairs, args)
+    print(f"[+] Merged {len(partials)} partial result(s). Report saved to {out}")
+    violations = sum(len(r["violations"]) for _, r in pairs)
+    sys.exit(2 if violations > 0 else 0)
+
+
+def shard_main(target: Path, args: List[str]):
+    from hrules.shards import parse_shard, scan_shard, merge_partials
+    try:
+        # Without --shard (a --checkpoint-only run) the whole tree is one shard
+        spec = _option(args, "--shard")
+        index, count = parse_shard("1/1" if spec is None else spec)
+    except ValueError as e:
+        print(f"[!] {e}")
+        sys.exit(1)
+    checkpoint = Path(_option(args, "--checkpoint") or f"hrules_shard{index}of{count}.jsonl")
+    scanned, skipped = scan_shard(target, index, count, checkpoint)
+    print(f"[+] Shard {index}/{count}: scanned {scanned} file(s), {skipped} already done. "
+          f"Partial results in {checkpoint}")
+    violations = sum(len(r["violations"]) for _, r in merge_partials([checkpoint]))
+    sys.exit(2 if violations > 0 else 0)
+
+
+def watch_main(args: List[str]):
+    from hrules.watch import watch_directory, PollingWatcher, DEFAULT_STATE
+    targets = _positionals(args)
+    if not targets or not Path(targets[0]).is_dir():
+        print(f"[!] --watch needs an existing directory.\n{USAGE}")
         sys.exit(1)
+    out = Path(_option(args, "--out") or DEFAULT_REPORT)
+    state = Path(_option(args, "--state") or DEFAULT_STATE)
+    try:
+        # Network mounts are polled anyway; --poll covers ones /proc/mounts does not reveal
+        watcher = PollingWatcher(Path(targets[0])) if "--poll" in args else None
+        watch_directory(Path(targets[0]), out, state, watcher=watcher)
+    except KeyboardInterrupt:
+        print(f"\n[+] Stopped watching. Report: {out}, state: {state}")
+    sys.exit(0)
 
-    target = Path(sys.argv[1])
+
+def _int_option(args: List[str], flag: str):
+    value = _option(args, flag)
+    try:
+        return int(value) if value is not None else None
+    except ValueError:
+        print(f"[!] {flag} expects a number.")
+        sys.exit(1)
+
+
+def serve_main(args: List[str]):
+    from hrules.service import serve
+    try:
+        serve(host=_option(args, "--host"), port=_int_option(args, "--port"),
+              socket_path=_option(args, "--socket"), workers=_int_option(args, "--workers"),
+              token_file=_option(args, "--token-file"))
+    except KeyboardInterrupt:
+        print("\n[+] Service stopped.")
+    sys.exit(0)
+
+
+def _finish(pairs: List[Tuple[Path, Dict]], target: Path, out: Optional[Path]):
+    """Store, diff and report the results of a scan, then exit with its status."""
+    _store_results(pairs, sys.argv)
+    pairs = _apply_baseline(pairs, sys.argv)
+    if target.is_dir():
+        out_path = out or Path(DEFAULT_REPORT)
+        write_report(pairs, out_path)
+        print(f"[+] Scan complete. Report saved to {out_path}")
+    else:
+        for p, res in pairs:
+            print(format_block(p, res))
+    violations = sum(len(r["violations"]) for _, r in pairs)
+    if _option(sys.argv, "--baseline"):
+        # With a baseline, only new findings fail the run
+        from hrules.baseline import RESOLVED_PREFIX
+        violations = sum(1 for _, r in pairs for v in r["violations"] if not v.startswith(RESOLVED_PREFIX))
+    sys.exit(2 if violations > 0 else 0)
+
+
+def _target_and_out(args: List[str]) -> Tuple[Path, Optional[Path]]:
+    targets = _positionals(args)
+    if not targets:
+        print(USAGE)
+        sys.exit(1)
+    target = Path(targets[0])
     out = None
-    if "--out" in sys.argv:
+    if "--out" in args:
         try:
-            out = Path(sys.argv[sys.argv.index("--out") + 1])
+            out = Path(args[args.index("--out") + 1])
         except Exception:
             print("Invalid --out usage. Example: hrules ./docs --out report.txt")
             sys.exit(1)
-
     if not target.exists():
         print(f"[!] Path not found: {target}")
         sys.exit(1)
+    return target, out
 
-    pairs: List[Tuple[Path, Dict]] = []
-    if target.is_dir():
-        pairs = scan_directory(target)
-        out_path = out or Path(DEFAULT_REPORT)
-        write_txt_report(pairs, out_path)
-        print(f"[+] Scan complete. Report saved to {out_path}")
-        violations = sum(len(r["violations"]) for _, r in pairs)
-        sys.exit(2 if violations > 0 else 0)
+
+def client_main(args: List[str]):
+    """Scan through a running service; returns (to scan locally) if none is reachable."""
+    target, out = _target_and_out(args)
+    pairs = scan_via_service([target], port=_int_option(args, "--port"),
+                             socket_path=_option(args, "--socket"),
+                             token_file=_option(args, "--token-file"))
+    if pairs is None:
+        print("[i] No hrules service reachable; scanning locally.", file=sys.stderr)
+        return
+    _finish(pairs, target, out)
+
+
+def main():
+    if len(sys.argv) < 2:
+        print(USAGE)
+        sys.exit(1)
+
+    # Before anything imports the scanner
+    if "--client" in sys.argv:
+        client_main(sys.argv[1:])
+
+    from hrules import scanner
+    # Applies to every mode that scans (directory, shard, watch, serve)
+    detail = _option(sys.argv, "--detail")
+    if detail:
+        if detail not in ("summary", "full"):
+            print(f"Invalid --detail value: {detail}\n{USAGE}")
+            sys.exit(1)
+        scanner.DETAIL = detail
+    if "--pdf-background" in sys.argv:
+        scanner.PDF_RASTER_BACKGROUND = True
+    # 'low' (any violation) when --fail-fast is given without a severity
+    scanner.FAIL_FAST_SEVERITY = _optional_value(sys.argv, "--fail-fast", "low")
+
+    if sys.argv[1] == "merge":
+        merge_main(sys.argv[2:])
+    if sys.argv[1] == "serve":
+        serve_main(sys.argv[2:])
+    if sys.argv[1] == "query":
+        query_main(sys.argv[2:])
+    if "--watch" in sys.argv:
+        watch_main(sys.argv[1:])
+
+    target, out = _target_and_out(sys.argv[1:])
+
+    if target.is_dir() and ("--shard" in sys.argv or "--checkpoint" in sys.argv):
+        shard_main(target, sys.argv[1:])
+    elif target.is_dir():
+        pairs = scanner.scan_directory(target)
+        if pairs and scanner.is_blocking(pairs[-1][1]):
+            print(f"[!] Fail-fast: stopped at {pairs[-1][0]}")
+        _finish(pairs, target, out)
     else:
-        res = scan_file(target)
-        block = format_block(target, res)
-        print(block)
-        sys.exit(2 if res["violations"] else 0)
+        _finish(scanner.scan_entries(target), target, out)
 
 
 if __name__ == "__main__":
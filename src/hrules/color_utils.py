@@ -1,5 +1,6 @@
 # color_utils.py
 from typing import Optional, Dict
+import numpy as np
 from docx.enum.dml import MSO_THEME_COLOR
 
 CONTRAST_THRESHOLD = 4.5
@@ -40,6 +41,25 @@ def contrast_ratio(fg_hex, bg_hex):
     return round((max(L1, L2) + 0.05) / (min(L1, L2) + 0.05), 2)
 
 
+def rel_luminances(rgb: np.ndarray) -> np.ndarray:
+    """WCAG relative luminance for an (..., 3) array of 0-255 sRGB values."""
+    c = np.asarray(rgb, dtype=np.float64) / 255.0
+    c = np.where(c <= 0.03928, c / 12.92, ((c + 0.055) / 1.055) ** 2.4)
+    return c @ np.array([0.2126, 0.7152, 0.0722])
+
+
+def contrast_ratios(fg_rgb: np.ndarray, bg_rgb: np.ndarray) -> np.ndarray:
+    """Vectorised contrast_ratio over matching (N, 3) arrays of 0-255 colours."""
+    l1 = rel_luminances(fg_rgb)
+    l2 = rel_luminances(bg_rgb)
+    return np.round((np.maximum(l1, l2) + 0.05) / (np.minimum(l1, l2) + 0.05), 2)
+
+
+def rgb_to_hex(rgb) -> str:
+    r, g, b = (int(round(float(c))) for c in rgb)
+    return f"#{r:02x}{g:02x}{b:02x}"
+
+
 def resolve_docx_color(font_color):
     """Return #rrggbb for a python-docx font color, or None."""
     if not font_color:
@@ -5,7 +5,7 @@ from tkinter import ttk, filedialog, messagebox
 from pathlib import Path
 from typing import List, Tuple, Dict
 
-from hrules.scanner import scan_file, scan_directory
+from hrules.scanner import scan_entries, scan_directory
 from hrules.report import format_block, write_txt_report, write_pdf_report
 
 APP_TITLE = "HRules — Document Visibility Scanner"
@@ -79,7 +79,7 @@ class App(tk.Tk):
             if self.target.is_dir():
                 self.results = scan_directory(self.target)
             else:
-                self.results = [(self.target, scan_file(self.target))]
+                self.results = scan_entries(self.target)
             for p, r in self.results:
                 self.txt_output.insert(tk.END, format_block(p, r))
             self.txt_output.see(tk.END)
@@ -1,7 +1,6 @@
+import json
 from pathlib import Path
-from typing import Dict, List, Tuple
-from reportlab.lib.pagesizes import A4
-from reportlab.pdfgen import canvas
+from typing import Dict, Iterator, List, Tuple
 
 H_START = "<<<HIGHLIGHT>>>"
 H_END = "<<<END>>>"
@@ -27,6 +26,8 @@ def write_txt_report(pairs: List[Tuple[Path, Dict[str, List[str]]]], out_path: P
     out_path.write_text("\n".join(out_lines), encoding="utf-8")
 
 def write_pdf_report(pairs: List[Tuple[Path, Dict[str, List[str]]]], out_path: Path) -> None:
+    from reportlab.lib.pagesizes import A4  # imported here: text/JSON reports (and --client) skip it
+    from reportlab.pdfgen import canvas
     c = canvas.Canvas(str(out_path), pagesize=A4)
     width, height = A4
     x, y = 40, height - 40
@@ -50,3 +51,30 @@ def write_pdf_report(pairs: List[Tuple[Path, Dict[str, List[str]]]], out_path: P
                 draw_line(f"  - Note: {n}")
         draw_line("")
     c.save()
+
+def to_record(path: Path, res: Dict[str, List[str]]) -> Dict:
+    return {"path": str(path), "violations": list(res.get("violations", [])), "notes": list(res.get("notes", []))}
+
+def from_record(record: Dict) -> Tuple[Path, Dict[str, List[str]]]:
+    return Path(record["path"]), {"violations": record.get("violations", []), "notes": record.get("notes", [])}
+
+def write_report(pairs: List[Tuple[Path, Dict[str, List[str]]]], out_path: Path) -> None:
+    """Pick the writer from the output suffix (.pdf, .json/.jsonl or text)."""
+    if out_path.suffix.lower() == ".pdf":
+        write_pdf_report(pairs, out_path)
+    elif out_path.suffix.lower() in (".json", ".jsonl"):
+        write_json_report(pairs, out_path)
+    else:
+        write_txt_report(pairs, out_path)
+
+def write_json_report(pairs: List[Tuple[Path, Dict[str, List[str]]]], out_path: Path) -> None:
+    """One JSON object per line (path, violations, notes), so large reports can be streamed."""
+    with open(out_path, "w", encoding="utf-8") as fh:
+        for p, r in pairs:
+            fh.write(json.dumps(to_record(p, r), ensure_ascii=False) + "\n")
+
+def read_json_report(report_path: Path) -> Iterator[Tuple[Path, Dict[str, List[str]]]]:
+    with open(report_path, encoding="utf-8") as fh:
+        for line in fh:
+            if line.strip():
+                yield from_record(json.loads(line))
@@ -1,11 +1,18 @@
 # scanner.py
+import email
+import email.policy
 import io
 import os
 import re
+import threading
+import time
+import zipfile
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 import cssutils
 import pytesseract
 from pathlib import Path
-from typing import Dict, List, Tuple, Any
+from typing import Dict, List, Tuple, Any, Callable, Iterable, Iterator, Optional
 from PIL import Image, ImageOps
 from docx import Document
 from docx.enum.dml import MSO_THEME_COLOR
@@ -13,7 +20,9 @@ from bs4 import BeautifulSoup
 from pathlib import Path
 from typing import Dict, List
 import fitz  # PyMuPDF
-from hrules.color_utils import contrast_ratio, CONTRAST_THRESHOLD, THEME_MAP, resolve_run_fg_hex
+import numpy as np
+from hrules.color_utils import (contrast_ratio, contrast_ratios, rgb_to_hex, CONTRAST_THRESHOLD,
+                                THEME_MAP, resolve_run_fg_hex)
 
 try:
     from psd_tools import PSDImage
@@ -32,6 +41,88 @@ HTML_EXTS = {".html", ".htm"}
 DOC_EXTS = {".pdf", ".docx"}
 PSD_EXTS = {".psd"}
 AI_EXTS = {".ai"}  # PDF-compatible in many cases
+ARCHIVE_EXTS = {".zip"}
+EMAIL_EXTS = {".eml"}
+CONTAINER_EXTS = ARCHIVE_EXTS | EMAIL_EXTS
+
+# Limits for scanning inside archives/emails (shared across nesting levels)
+MAX_CONTAINER_DEPTH = 3
+MAX_CONTAINER_MEMBERS = 1000
+MAX_CONTAINER_BYTES = 512 * 1024 * 1024
+
+# Images above OCR_MAX_PIXELS are split into overlapping tiles and OCR'd concurrently,
+# so Tesseract only ever sees (and allocates for) one tile at a time per worker.
+OCR_TILE_SIZE = 2048
+OCR_TILE_OVERLAP = 128
+OCR_MAX_PIXELS = 12_000_000
+OCR_WORKERS = min(4, os.cpu_count() or 1)
+# Largest image decoded from a file on disk (A0 at 600 DPI is ~558 MP); larger ones get a
+# note instead of OCR. ZIP/EML members and service uploads keep Pillow's own
+# decompression-bomb limit (twice Image.MAX_IMAGE_PIXELS), which is left untouched.
+IMAGE_MAX_PIXELS = 1_000_000_000
+_PIXEL_LIMIT_LOCK = threading.Lock()
+
+# Read-ahead for scan_directory: files are read on a thread pool while earlier ones are
+# parsed, keeping at most PREFETCH_BYTES (and PREFETCH_DEPTH files) buffered.
+PREFETCH_WORKERS = 8
+PREFETCH_BYTES = 64 * 1024 * 1024
+PREFETCH_DEPTH = 64
+
+# Opt-in: sample the real background under PDF text from one low-DPI render per page
+# instead of assuming white. Pages past the time budget fall back to white.
+PDF_RASTER_BACKGROUND = False
+PDF_BACKGROUND_DPI = 36
+PDF_BACKGROUND_TIME_BUDGET = 30.0  # seconds per document
+
+# Extracted PDF images are kept (per xref) for the transparency, image_contrast and ocr
+# checks of one scan, up to this many bytes; past it they are re-extracted per check.
+PDF_IMAGE_CACHE_BYTES = 256 * 1024 * 1024
+
+# Hidden-text heuristics for PDF text traces
+PDF_MIN_FONT_SIZE = 2.0   # points; anything smaller is unreadable in print or on screen
+PDF_MIN_OPACITY = 0.1
+
+# Word boxes below this Tesseract confidence are treated as noise for contrast checks
+OCR_MIN_WORD_CONF = 30
+
+# Relative cost of each check. Scanners run their checks cheapest first, so a fail-fast
+# run can stop on a zero-width character long before it reaches OCR.
+CHECK_COSTS = {
+    "zero_width": 1,
+    "hidden_runs": 1,
+    "css": 2,
+    "hidden_text": 3,
+    "contrast": 5,
+    "exif": 5,
+    "transparency": 20,
+    "image_contrast": 100,
+    "ocr": 100,
+}
+
+SEVERITIES = ["low", "medium", "high"]
+
+# (pattern, kind, severity) used to classify violation lines; first match wins
+VIOLATION_KINDS = [
+    (re.compile(r"hidden/zero-width"), "zero_width", "high"),
+    (re.compile(r"hidden text runs"), "hidden_run", "high"),
+    (re.compile(r"PDF hidden text"), "hidden_text", "high"),
+    (re.compile(r"Hidden CSS"), "hidden_css", "high"),
+    (re.compile(r"PSD hidden layer"), "hidden_layer", "high"),
+    (re.compile(r"image low-contrast|Image low-contrast"), "image_low_contrast", "medium"),
+    (re.compile(r"low-contrast", re.IGNORECASE), "low_contrast", "medium"),
+    (re.compile(r"transparen", re.IGNORECASE), "transparency", "low"),
+]
+
+# Repeated findings (same kind and colour pair) are reported once with an occurrence
+# count, page list and at most MAX_SAMPLES excerpts. DETAIL = "full" restores one
+# violation line per span/run/word line.
+DETAIL = "summary"
+MAX_SAMPLES = 3
+MAX_PAGE_RANGES = 10
+
+# When set to a severity, stop a file's checks (and directory scans) at the first
+# violation at or above it.
+FAIL_FAST_SEVERITY = None
 
 EXIF_KEYS_OF_INTEREST = {
     270: "ImageDescription",
@@ -93,39 +184,261 @@ def luminance(rgb: Tuple[int, int, int]) -> float:
 #     return round((max(L1, L2) + 0.05) / (min(L1, L2) + 0.05), 2)
 
 
-def detect_transparency(image_path_or_bytes) -> Tuple[bool, float]:
-    if isinstance(image_path_or_bytes, (str, Path)):
-        img = Image.open(image_path_or_bytes)
-    else:
-        img = Image.open(io.BytesIO(image_path_or_bytes))
-    if img.mode != "RGBA":
-        img = img.convert("RGBA")
-    pixels = img.getdata()
-    non_opaque = sum(1 for p in pixels if p[3] < 255)
-    ratio = non_opaque / max(1, len(pixels))
+def image_pixel_limit(path: Path) -> int:
+    """Largest image decoded for path: IMAGE_MAX_PIXELS for a file on disk, Pillow's limit
+    for ZIP/EML members and uploads (nested paths like bundle.zip!/scan.png)."""
+    if "!/" in str(path) and Image.MAX_IMAGE_PIXELS is not None:
+        return 2 * Image.MAX_IMAGE_PIXELS
+    return IMAGE_MAX_PIXELS
+
+
+def open_image(image_path_or_bytes, max_pixels: int = None) -> Image.Image:
+    """Lazily open an image, raising Image.DecompressionBombError above max_pixels
+    (default: Pillow's own limit). Only the header is read here."""
+    fp = image_path_or_bytes if isinstance(image_path_or_bytes, (str, Path)) else io.BytesIO(image_path_or_bytes)
+    with _PIXEL_LIMIT_LOCK:
+        default = Image.MAX_IMAGE_PIXELS
+        # Pillow checks the header size against its global inside open(); a larger local
+        # limit can only be applied by lifting that check for this one header read.
+        lift = max_pixels is not None and default is not None and max_pixels > 2 * default
+        if lift:
+            Image.MAX_IMAGE_PIXELS = None
+        try:
+            img = Image.open(fp)
+        finally:
+            Image.MAX_IMAGE_PIXELS = default
+    if max_pixels is not None and img.width * img.height > max_pixels:
+        raise Image.DecompressionBombError(
+            f"Image size ({img.width * img.height} pixels) exceeds limit of {max_pixels} pixels")
+    return img
+
+
+def detect_transparency(image_path_or_bytes, max_pixels: int = None) -> Tuple[bool, float]:
+    try:
+        img = open_image(image_path_or_bytes, max_pixels)
+    except Image.DecompressionBombError:
+        return False, 0.0  # the OCR check reports the size
+    if img.mode not in ("RGBA", "LA", "PA") and "transparency" not in img.info:
+        return False, 0.0
+    if img.mode not in ("RGBA", "LA", "PA"):
+        img = img.convert("RGBA")  # palette/greyscale with a transparent colour
+    # Count on the alpha band alone (one byte per pixel)
+    alpha = np.asarray(img.getchannel("A"))
+    ratio = float((alpha < 255).mean()) if alpha.size else 0.0
     return ratio > 0, ratio
 
 
+def tile_boxes(width: int, height: int, tile_size: int, overlap: int) -> List[Tuple[int, int, int, int]]:
+    """Row-major (left, top, right, bottom) boxes covering the image with overlapping tiles."""
+    step = max(1, tile_size - overlap)
+
+    def starts(length):
+        if length <= tile_size:
+            return [0]
+        out = list(range(0, length - tile_size, step))
+        out.append(length - tile_size)
+        return out
+
+    return [(x, y, x + min(tile_size, width), y + min(tile_size, height))
+            for y in starts(height) for x in starts(width)]
+
+
+def _flatten(img: Image.Image, mode: str = "RGB") -> Image.Image:
+    """img in mode, with transparent areas rendered on white as every viewer we care about does."""
+    if img.mode in ("RGBA", "LA", "PA") or "transparency" in img.info:
+        img = Image.alpha_composite(Image.new("RGBA", img.size, "white"), img.convert("RGBA"))
+    return img if img.mode == mode else img.convert(mode)
+
+
+def _ocr_tiles(img: Image.Image):
+    """One image_to_data pass per tile: (tile boxes, per-tile OCR data).
+
+    Tiles are cropped from the decoded image and converted to greyscale one at a time,
+    so the decoded image is the only full-size raster held in memory.
+    """
+    img.load()  # decode once here, not concurrently from the tile threads
+    if img.width * img.height <= OCR_MAX_PIXELS:
+        boxes = [(0, 0, img.width, img.height)]
+    else:
+        boxes = tile_boxes(img.width, img.height, OCR_TILE_SIZE, min(OCR_TILE_OVERLAP, OCR_TILE_SIZE // 2))
+
+    def ocr_tile(box):
+        try:
+            tile = _flatten(img if len(boxes) == 1 else img.crop(box), "L")
+            return pytesseract.image_to_data(tile, config="--psm 6", output_type=pytesseract.Output.DICT)
+        except Exception:
+            return {}
+
+    with ThreadPoolExecutor(max_workers=OCR_WORKERS) as pool:
+        return boxes, list(pool.map(ocr_tile, boxes))
+
+
+def _word_conf(data: Dict, i: int) -> float:
+    try:
+        return float(data["conf"][i])
+    except (KeyError, TypeError, ValueError):
+        return -1.0
+
+
+def _overlap(a: Tuple[int, int, int, int], b: Tuple[int, int, int, int]) -> float:
+    """Intersection of two boxes as a fraction of the smaller one."""
+    w = min(a[2], b[2]) - max(a[0], b[0])
+    h = min(a[3], b[3]) - max(a[1], b[1])
+    if w <= 0 or h <= 0:
+        return 0.0
+    return w * h / max(1, min((a[2] - a[0]) * (a[3] - a[1]), (b[2] - b[0]) * (b[3] - b[1])))
+
+
+def _tile_words(boxes: List[Tuple[int, int, int, int]], tile_data: List[Dict],
+                min_conf: float = OCR_MIN_WORD_CONF) -> List[Tuple[str, Tuple[int, int, int, int], int]]:
+    """(word, (left, top, right, bottom), line number) for OCR words in image coordinates, in reading order.
+
+    A word read in two overlapping tiles is kept once, as its widest reading (the other
+    may be clipped by a tile edge). Lines are then rebuilt from the word boxes, so a line
+    crossing several tiles comes out whole.
+    """
+    found = []
+    for (x0, y0, _, _), data in zip(boxes, tile_data):
+        for i, text in enumerate(data.get("text", [])):
+            text = (text or "").strip()
+            if not text or _word_conf(data, i) < min_conf:
+                continue
+            left, top = x0 + data["left"][i], y0 + data["top"][i]
+            found.append((text, (left, top, left + data["width"][i], top + data["height"][i])))
+
+    kept, grid = [], {}  # grid: OCR_TILE_OVERLAP-sized cells -> kept boxes, to find duplicates nearby
+    cell = max(1, OCR_TILE_OVERLAP)
+    for text, box in sorted(found, key=lambda w: w[1][0] - w[1][2]):
+        cx, cy = (box[0] + box[2]) // 2 // cell, (box[1] + box[3]) // 2 // cell
+        near = [b for dx in (-1, 0, 1) for dy in (-1, 0, 1) for b in grid.get((cx + dx, cy + dy), ())]
+        if any(_overlap(box, b) > 0.5 for b in near):
+            continue
+        grid.setdefault((cx, cy), []).append(box)
+        kept.append((text, box))
+
+    # A word starts a new line unless its vertical centre falls within the current line
+    kept.sort(key=lambda w: (w[1][1] + w[1][3], w[1][0]))
+    lines: List[List] = []  # [top, bottom, words]
+    for text, box in kept:
+        centre = (box[1] + box[3]) / 2
+        if lines and lines[-1][0] <= centre <= lines[-1][1]:
+            lines[-1][0], lines[-1][1] = min(lines[-1][0], box[1]), max(lines[-1][1], box[3])
+            lines[-1][2].append((text, box))
+        else:
+            lines.append([box[1], box[3], [(text, box)]])
+    return [(text, box, n) for n, (_, _, words) in enumerate(lines)
+            for text, box in sorted(words, key=lambda w: w[1][0])]
+
+
+def _tile_text(boxes: List[Tuple[int, int, int, int]], tile_data: List[Dict]) -> str:
+    """OCR text rebuilt from every recognised word, one output line per image line."""
+    lines: Dict[int, List[str]] = {}
+    for text, _, line in _tile_words(boxes, tile_data, min_conf=0):
+        lines.setdefault(line, []).append(text)
+    return "\n".join(" ".join(words) for words in lines.values())
+
+
+def _ocr_image(img: Image.Image) -> str:
+    if img.width * img.height > OCR_MAX_PIXELS:
+        # Decode straight to 8-bit greyscale where the codec allows it (JPEG)
+        img.draft("L", img.size)
+    return _tile_text(*_ocr_tiles(img))
+
+
 def ocr_image_bytes(image_bytes: bytes) -> str:
     try:
-        img = Image.open(io.BytesIO(image_bytes))
-        img = ImageOps.grayscale(img)
-        text = pytesseract.image_to_string(img, config="--psm 6").strip()
-        return text
+        return _ocr_image(open_image(image_bytes))
     except Exception:
         return ""
 
 
 def ocr_image_path(path: Path) -> str:
     try:
-        img = Image.open(path)
-        img = ImageOps.grayscale(img)
-        text = pytesseract.image_to_string(img, config="--psm 6").strip()
-        return text
+        return _ocr_image(open_image(path, image_pixel_limit(path)))
     except Exception:
         return ""
 
 
+def _read_text(path: Path, data: bytes = None) -> str:
+    if data is not None:
+        return data.decode("utf-8", errors="ignore")
+    return path.read_text(encoding="utf-8", errors="ignore")
+
+
+def estimate_word_colors(img: Image.Image, boxes: List[Tuple[int, int, int, int]]) -> Tuple[np.ndarray, np.ndarray]:
+    """Foreground/background colour per word box as two (N, 3) arrays.
+
+    Background is the median of the box border; foreground is the mean of the pixels
+    furthest (top 10%) from the background in luminance, i.e. the glyph cores.
+    """
+    weights = np.array([0.2126, 0.7152, 0.0722])
+    fg = np.zeros((len(boxes), 3))
+    bg = np.zeros((len(boxes), 3))
+    for i, box in enumerate(boxes):
+        px = np.asarray(_flatten(img.crop(box)), dtype=np.float64)
+        if px.size == 0:
+            continue
+        border = np.concatenate([px[0], px[-1], px[:, 0], px[:, -1]])
+        bg[i] = np.median(border, axis=0)
+        flat = px.reshape(-1, 3)
+        dist = np.abs(flat @ weights - bg[i] @ weights)
+        fg[i] = flat[dist >= np.percentile(dist, 90)].mean(axis=0)
+    return fg, bg
+
+
+def analyze_image_text(image_path_or_bytes, max_pixels: int = None) -> Tuple[str, List[Dict[str, Any]]]:
+    """OCR an image once: (OCR text, low-contrast text lines checked against CONTRAST_THRESHOLD).
+
+    Raises Image.DecompressionBombError for images above max_pixels (see open_image).
+    """
+    try:
+        img = open_image(image_path_or_bytes, max_pixels)
+        boxes, tile_data = _ocr_tiles(img)
+    except Image.DecompressionBombError:
+        raise
+    except Exception:
+        return "", []
+    text = _tile_text(boxes, tile_data)
+    words = _tile_words(boxes, tile_data)
+    if not words:
+        return text, []
+
+    fg, bg = estimate_word_colors(img, [box for _, box, _ in words])
+    ratios = contrast_ratios(fg, bg)
+    # ratio 1.0 means no ink found in the box at all: an OCR ghost, not faint text
+    flagged = np.flatnonzero((ratios < CONTRAST_THRESHOLD) & (ratios > 1.0))
+
+    lines = {}
+    for i in flagged:
+        lines.setdefault(words[i][2], []).append(i)
+    findings = []
+    for idx in lines.values():
+        findings.append({
+            "text": " ".join(words[i][0] for i in idx),
+            "fg": rgb_to_hex(np.median(fg[idx], axis=0)),
+            "bg": rgb_to_hex(np.median(bg[idx], axis=0)),
+            "ratio": float(np.median(ratios[idx])),
+        })
+    return text, findings
+
+
+def detect_image_text_contrast(image_path_or_bytes) -> List[Dict[str, Any]]:
+    """Low-contrast OCR'd text lines baked into an image, checked against CONTRAST_THRESHOLD."""
+    return analyze_image_text(image_path_or_bytes)[1]
+
+
+def _analyzed(cache: Dict, key, image_path_or_bytes,
+              max_pixels: int = None) -> Tuple[Optional[str], List[Dict[str, Any]]]:
+    # analyze_image_text memoised per scan: the image_contrast and ocr checks share one OCR pass.
+    # Text is None for images too large to decode.
+    if key not in cache:
+        try:
+            cache[key] = analyze_image_text(image_path_or_bytes, max_pixels)
+        except Image.DecompressionBombError:
+            cache[key] = (None, [])
+    return cache[key]
+
+
 def detect_hidden_chars(text: str) -> Tuple[int, str]:
     matches = list(re.finditer(ZERO_WIDTH_CHARS, text))
     highlighted = re.sub(ZERO_WIDTH_CHARS, ZW_LABEL, text)
@@ -137,7 +450,7 @@ def detect_low_contrast_in_text_blob(text: str) -> List[Dict[str, Any]]:
     for m in INLINE_STYLE_COLOR_PAIR.finditer(text):
         fg, bg = m.group(1), m.group(2)
         try:
-            ratio = contrast_ratio(hex_to_rgb(fg), hex_to_rgb(bg))
+            ratio = contrast_ratio(fg, bg)
         except Exception:
             continue
         if ratio < CONTRAST_THRESHOLD:
@@ -185,7 +498,7 @@ def analyze_css(css_text: str, selector_source="CSS") -> List[Dict[str, Any]]:
             out.append({"type": "hidden_css", "selector": rule.selectorText, "snippet": "\n".join(hidden_snippets)})
         if color and bg:
             try:
-                ratio = contrast_ratio(hex_to_rgb(color), hex_to_rgb(bg))
+                ratio = contrast_ratio(color, bg)
             except Exception:
                 continue
             if ratio < CONTRAST_THRESHOLD:
@@ -194,10 +507,76 @@ def analyze_css(css_text: str, selector_source="CSS") -> List[Dict[str, Any]]:
     return out
 
 
-def scan_exif(path: Path) -> List[str]:
+def classify_violation(violation: str) -> Tuple[str, str]:
+    """(kind, severity) for a violation line."""
+    for pattern, kind, severity in VIOLATION_KINDS:
+        if pattern.search(violation):
+            return kind, severity
+    return "other", "medium"
+
+
+def is_blocking(res: Dict[str, List[str]], severity: str = None) -> bool:
+    """True if res has a violation at or above severity (default FAIL_FAST_SEVERITY)."""
+    severity = severity or FAIL_FAST_SEVERITY
+    if not severity:
+        return False
+    floor = SEVERITIES.index(severity)
+    return any(SEVERITIES.index(classify_violation(line)[1]) >= floor for line in res.get("violations", []))
+
+
+def run_checks(checks: List[Tuple[str, Callable[[List[str], List[str]], None]]]) -> Dict[str, List[str]]:
+    """Run (name, check) pairs in CHECK_COSTS order; each check appends to violations/notes."""
+    v, n = [], []
+    ordered = sorted(checks, key=lambda c: CHECK_COSTS.get(c[0], 50))
+    for i, (name, check) in enumerate(ordered):
+        check(v, n)
+        if i + 1 < len(ordered) and is_blocking({"violations": v}):
+            n.append(f"Fail-fast: stopped after {name} check; skipped {', '.join(c[0] for c in ordered[i + 1:])}.")
+            break
+    return {"violations": v, "notes": n}
+
+
+def format_pages(pages: Iterable[int]) -> str:
+    """'page 3' or 'pages 1-4, 9' (at most MAX_PAGE_RANGES ranges, then '+N more')."""
+    nums = sorted(set(pages))
+    if len(nums) == 1:
+        return f"page {nums[0]}"
+    ranges = []
+    for num in nums:
+        if ranges and num == ranges[-1][1] + 1:
+            ranges[-1][1] = num
+        else:
+            ranges.append([num, num])
+    parts = [str(a) if a == b else f"{a}-{b}" for a, b in ranges[:MAX_PAGE_RANGES]]
+    if len(ranges) > MAX_PAGE_RANGES:
+        parts.append(f"+{len(ranges) - MAX_PAGE_RANGES} more")
+    return "pages " + ", ".join(parts)
+
+
+class FindingGroups:
+    """Occurrence count, pages and up to MAX_SAMPLES distinct (page, excerpt) samples per key."""
+
+    def __init__(self):
+        self.groups: Dict[Any, Dict[str, Any]] = {}
+
+    def add(self, key, page: int = None, sample: str = None, count: int = 1, ratio: float = None):
+        g = self.groups.setdefault(key, {"count": 0, "pages": set(), "samples": [], "ratio": None})
+        g["count"] += count
+        if page is not None:
+            g["pages"].add(page)
+        if ratio is not None and (g["ratio"] is None or ratio < g["ratio"]):
+            g["ratio"] = ratio
+        if sample and len(g["samples"]) < MAX_SAMPLES and (page, sample) not in g["samples"]:
+            g["samples"].append((page, sample))
+
+    def items(self):
+        return self.groups.items()
+
+
+def scan_exif(path: Path, data: bytes = None) -> List[str]:
     findings = []
     try:
-        img = Image.open(path)
+        img = open_image(data if data is not None else path, image_pixel_limit(path))
         exif = img.getexif()
         if not exif:
             return findings
@@ -216,79 +595,235 @@ def scan_exif(path: Path) -> List[str]:
     return findings
 
 
-def scan_pdf(path: Path) -> Dict[str, List[str]]:
-    v, n = [], []
-    doc = fitz.open(str(path))
+def pdf_text_spans(page) -> List[Tuple[Tuple[int, int, int], Tuple[float, float, float, float], str]]:
+    """(rgb, bbox, text) for every text span on the page."""
+    spans = []
+    for block in page.get_text("dict").get("blocks", []):
+        for line in block.get("lines", []):
+            for span in line.get("spans", []):
+                color_val = span.get("color")
+                # Handle tuple of floats (0..1)
+                if isinstance(color_val, tuple) and len(color_val) == 3:
+                    rgb = tuple(int(c * 255) for c in color_val)
+                # Handle integer color (e.g., 16777215 for white)
+                elif isinstance(color_val, int):
+                    rgb = ((color_val >> 16) & 255, (color_val >> 8) & 255, color_val & 255)
+                else:
+                    continue
+                spans.append((rgb, tuple(span["bbox"]), span.get("text", "")))
+    return spans
+
+
+def sample_page_background(page, bboxes: List[Tuple[float, float, float, float]], dpi: int = None) -> np.ndarray:
+    """Background colour under each bbox from one low-DPI render of the page, as an (N, 3) array.
+
+    Takes the median of a ring of points just outside each box so the glyphs themselves
+    do not count as background.
+    """
+    dpi = dpi or PDF_BACKGROUND_DPI
+    pix = page.get_pixmap(dpi=dpi, colorspace=fitz.csRGB, alpha=False)
+    raster = np.frombuffer(pix.samples, dtype=np.uint8).reshape(pix.height, pix.stride)
+    raster = raster[:, :pix.width * 3].reshape(pix.height, pix.width, 3)
+
+    if page.rotation:
+        bboxes = [tuple(fitz.Rect(b) * page.rotation_matrix) for b in bboxes]
+    scale = dpi / 72.0
+    b = np.asarray(bboxes, dtype=np.float64) * scale
+    x0, y0, x1, y1 = b[:, 0:1] - 1, b[:, 1:2] - 1, b[:, 2:3] + 1, b[:, 3:4] + 1
+    xm, ym, w = (x0 + x1) / 2, (y0 + y1) / 2, x1 - x0
+    xs = np.hstack([x0, x0 + w / 4, xm, x0 + 3 * w / 4, x1] * 2 + [x0, x1])
+    ys = np.hstack([y0] * 5 + [y1] * 5 + [ym, ym])
+    xs = np.clip(xs.astype(int), 0, pix.width - 1)
+    ys = np.clip(ys.astype(int), 0, pix.height - 1)
+    return np.median(raster[ys, xs].astype(np.float64), axis=1)
+
+
+def _rects_covering(rects: np.ndarray, rect_seq: np.ndarray, boxes: np.ndarray,
+                    box_seq: np.ndarray = None) -> np.ndarray:
+    """Per box: does any rect fully contain it (and, with seqnos, get painted after it)?"""
+    covered = np.zeros(len(boxes), dtype=bool)
+    if not len(rects) or not len(boxes):
+        return covered
+    for start in range(0, len(boxes), 1024):  # bound the boxes x rects matrix
+        b = boxes[start:start + 1024, None, :]
+        hit = ((rects[None, :, 0] <= b[..., 0] + 0.5) & (rects[None, :, 1] <= b[..., 1] + 0.5) &
+               (rects[None, :, 2] >= b[..., 2] - 0.5) & (rects[None, :, 3] >= b[..., 3] - 0.5))
+        if box_seq is not None:
+            hit &= rect_seq[None, :] > box_seq[start:start + 1024, None]
+        covered[start:start + 1024] = hit.any(axis=1)
+    return covered
+
+
+def detect_pdf_hidden_text(page) -> Dict[str, List[str]]:
+    """Hidden-text tricks on a page from PyMuPDF text traces and vector drawings, by reason.
+
+    Catches invisible render mode (unless it sits on an image, as OCR text layers do),
+    near-zero opacity, text outside the visible page, text painted over by a later
+    opaque filled rectangle, and microscopic font sizes. Nothing is rasterized.
+    """
+    traces = [t for t in page.get_texttrace() if t.get("type") in (0, 1, 3)]
+    texts = ["".join(chr(c[0]) for c in t["chars"]).strip() for t in traces]
+    keep = [i for i, t in enumerate(texts) if t]
+    if not keep:
+        return {}
+    traces = [traces[i] for i in keep]
+    texts = [texts[i] for i in keep]
+
+    boxes = np.array([t["bbox"] for t in traces], dtype=np.float64)
+    seq = np.array([t.get("seqno", 0) for t in traces])
+    kind = np.array([t["type"] for t in traces])
+    opacity = np.array([1.0 if t.get("opacity") is None else t["opacity"] for t in traces])
+    size = np.array([t.get("size", 0) for t in traces], dtype=np.float64)
+    # Traces and drawings are in unrotated page space; page.rect is the rotated view
+    area = page.rect * page.derotation_matrix
+
+    fills = [d for d in page.get_drawings()
+             if d.get("fill") is not None and (d.get("fill_opacity") is None or d["fill_opacity"] >= 0.99)
+             and len(d.get("items", [])) == 1 and d["items"][0][0] in ("re", "qu")]
+    fill_rects = np.array([tuple(d["rect"]) for d in fills], dtype=np.float64).reshape(-1, 4)
+    fill_seq = np.array([d.get("seqno", 0) for d in fills])
+    image_rects = np.array([tuple(i["bbox"]) for i in page.get_image_info()], dtype=np.float64).reshape(-1, 4)
+
+    off_page = ((boxes[:, 2] <= area.x0) | (boxes[:, 0] >= area.x1) |
+                (boxes[:, 3] <= area.y0) | (boxes[:, 1] >= area.y1))
+    reasons = {
+        "invisible render mode": (kind == 3) & ~_rects_covering(image_rects, None, boxes),
+        "zero opacity": (kind != 3) & (opacity < PDF_MIN_OPACITY),
+        "outside visible page area": off_page,
+        "covered by filled shape": (kind != 3) & ~off_page & _rects_covering(fill_rects, fill_seq, boxes, seq),
+        f"font size below {PDF_MIN_FONT_SIZE:g}pt": size < PDF_MIN_FONT_SIZE,
+    }
+    return {reason: [texts[i] for i in np.flatnonzero(mask)] for reason, mask in reasons.items() if mask.any()}
+
+
+def scan_pdf(path: Path, data: bytes = None) -> Dict[str, List[str]]:
+    doc = fitz.open(stream=data, filetype="pdf") if data is not None else fitz.open(str(path))
+
+    # --- Hidden text (render mode, opacity, position, overdraw, size) ---
+    def hidden_text(v, n):
+        groups = FindingGroups()
+        for page_num, page in enumerate(doc, start=1):
+            try:
+                for reason, texts in detect_pdf_hidden_text(page).items():
+                    excerpt = " | ".join(texts)[:300]
+                    if DETAIL == "full":
+                        v.append(f"PDF hidden text on page {page_num}: {reason} ({len(texts)} spans) ")
+                        n.append(f"Hidden excerpt (p{page_num}, {reason}): {excerpt}")
+                    else:
+                        groups.add(reason, page_num, excerpt, count=len(texts))
+            except Exception:
+                pass
+        for reason, g in groups.items():
+            v.append(f"PDF hidden text on {format_pages(g['pages'])}: {reason} ({g['count']} spans) ")
+            n.extend(f"Hidden excerpt (p{p}, {reason}): {t}" for p, t in g["samples"])
 
     # --- Low-contrast text detection ---
-    for page_num, page in enumerate(doc, start=1):
-        try:
-            text_dict = page.get_text("dict")
-            for block in text_dict.get("blocks", []):
-                for line in block.get("lines", []):
-                    for span in line.get("spans", []):
-                        try:
-                            color_val = span.get("color")
-                            fg_hex = None
-
-                            # Handle tuple of floats (0..1)
-                            if isinstance(color_val, tuple) and len(color_val) == 3:
-                                r, g, b = [int(c * 255) for c in color_val]
-                                fg_hex = f"#{r:02x}{g:02x}{b:02x}"
-
-                            # Handle integer color (e.g., 16777215 for white)
-                            elif isinstance(color_val, int):
-                                r = (color_val >> 16) & 255
-                                g = (color_val >> 8) & 255
-                                b = color_val & 255
-                                fg_hex = f"#{r:02x}{g:02x}{b:02x}"
-
-                            if fg_hex:
-                                bg_hex = "#FFFFFF"  # assume white background
-                                ratio = contrast_ratio(fg_hex, bg_hex)
-                                if ratio < CONTRAST_THRESHOLD:
-                                    v.append(f"PDF low-contrast text on page {page_num}: {fg_hex} on {bg_hex} ")
-                                    if span["text"].strip():
-                                        n.append(f"Excerpt (p{page_num}): {span['text']}")
-                        except Exception as e:
-                            print(f"ERROR in span loop: {e}")
-        except Exception:
-            pass
+    def contrast(v, n):
+        groups = FindingGroups()
+        raster_deadline = time.monotonic() + PDF_BACKGROUND_TIME_BUDGET
+        for page_num, page in enumerate(doc, start=1):
+            try:
+                spans = pdf_text_spans(page)
+                if not spans:
+                    continue
+                fg = np.array([rgb for rgb, _, _ in spans], dtype=np.float64)
+                bg = np.full_like(fg, 255.0)  # assume white background
+                if PDF_RASTER_BACKGROUND:
+                    if time.monotonic() < raster_deadline:
+                        bg = sample_page_background(page, [bbox for _, bbox, _ in spans])
+                    elif raster_deadline:
+                        n.append(f"PDF background sampling stopped at page {page_num} (time budget); "
+                                 f"assuming white background from there.")
+                        raster_deadline = 0
+                ratios = contrast_ratios(fg, bg)
+                for i in np.flatnonzero(ratios < CONTRAST_THRESHOLD):
+                    fg_hex, bg_hex = rgb_to_hex(fg[i]), rgb_to_hex(bg[i])
+                    text = spans[i][2]
+                    if DETAIL == "full":
+                        v.append(f"PDF low-contrast text on page {page_num}: {fg_hex} on {bg_hex} ")
+                        if text.strip():
+                            n.append(f"Excerpt (p{page_num}): {text}")
+                    else:
+                        groups.add((fg_hex, bg_hex), page_num, text.strip()[:300])
+            except Exception:
+                pass
+        for (fg_hex, bg_hex), g in groups.items():
+            v.append(f"PDF low-contrast text on {format_pages(g['pages'])}: {fg_hex} on {bg_hex} "
+                     f"({g['count']} occurrences) ")
+            n.extend(f"Excerpt (p{p}): {t}" for p, t in g["samples"])
 
     # --- Hidden/zero-width characters ---
-    full_text = "\n".join(page.get_text() for page in doc)
-    hidden_count, highlighted = detect_hidden_chars(full_text)
-    if hidden_count:
-        v.append(f"PDF hidden/zero-width text: {hidden_count} occurrences ")
-        n.append("PDF text excerpt:\n" + highlighted[:800] + ("\n..." if len(highlighted) > 800 else ""))
-
-    # --- Images: transparency + OCR ---
-    for page_num, page in enumerate(doc, start=1):
-        images = page.get_images(full=True)
-        for img_index, img in enumerate(images):
+    def zero_width(v, n):
+        full_text = "\n".join(page.get_text() for page in doc)
+        hidden_count, highlighted = detect_hidden_chars(full_text)
+        if hidden_count:
+            v.append(f"PDF hidden/zero-width text: {hidden_count} occurrences ")
+            n.append("PDF text excerpt:\n" + highlighted[:800] + ("\n..." if len(highlighted) > 800 else ""))
+
+    # --- Images: transparency, baked-in contrast, OCR ---
+    analyzed = {}
+    max_pixels = image_pixel_limit(path)
+    extracted: Dict[int, bytes] = {}
+    cache_budget = {"bytes": PDF_IMAGE_CACHE_BYTES}
+
+    def image_bytes(xref: int) -> bytes:
+        if xref in extracted:
+            return extracted[xref]
+        png = fitz.Pixmap(doc, xref).tobytes("png")
+        if len(png) <= cache_budget["bytes"]:
+            extracted[xref] = png
+            cache_budget["bytes"] -= len(png)
+        return png
+
+    def page_images():
+        for page_num, page in enumerate(doc, start=1):
+            for img in page.get_images(full=True):
+                try:
+                    yield page_num, img[0], image_bytes(img[0])
+                except Exception:
+                    continue
+
+    def transparency(v, n):
+        for page_num, _, img_bytes in page_images():
             try:
-                xref = img[0]
-                pix = fitz.Pixmap(doc, xref)
-                img_bytes = pix.tobytes("png")
-                has_trans, ratio = detect_transparency(img_bytes)
+                has_trans, ratio = detect_transparency(img_bytes, max_pixels)
                 if has_trans:
                     v.append(f"PDF page {page_num} image transparency: {ratio*100:.2f}% ")
-                ocr = ocr_image_bytes(img_bytes)
-                if ocr:
-                    pdf_ocr_excerpt = ocr[:300].replace("\n", " ")
-                    n.append(f"PDF page {page_num} image OCR text: {pdf_ocr_excerpt}")
             except Exception:
                 pass
 
-    return {"violations": v, "notes": n}
+    def image_contrast(v, n):
+        groups = FindingGroups()
+        for page_num, xref, img_bytes in page_images():
+            for item in _analyzed(analyzed, xref, img_bytes, max_pixels)[1]:
+                if DETAIL == "full":
+                    v.append(f"PDF page {page_num} image low-contrast text: {item['fg']} on {item['bg']} "
+                             f"(ratio {item['ratio']:.2f}) ")
+                    n.append(f"Excerpt (p{page_num} image): {item['text'][:300]}")
+                else:
+                    groups.add((item["fg"], item["bg"]), page_num, item["text"][:300], ratio=item["ratio"])
+        for (fg_hex, bg_hex), g in groups.items():
+            v.append(f"PDF image low-contrast text on {format_pages(g['pages'])}: {fg_hex} on {bg_hex} "
+                     f"(ratio {g['ratio']:.2f}) ({g['count']} occurrences) ")
+            n.extend(f"Excerpt (p{p} image): {t}" for p, t in g["samples"])
 
+    def ocr(v, n):
+        for page_num, xref, img_bytes in page_images():
+            text = _analyzed(analyzed, xref, img_bytes, max_pixels)[0]
+            if text is None:
+                n.append(f"PDF page {page_num} image too large to OCR (over {max_pixels:,} pixels).")
+            elif text:
+                pdf_ocr_excerpt = text[:300].replace("\n", " ")
+                n.append(f"PDF page {page_num} image OCR text: {pdf_ocr_excerpt}")
 
-def scan_docx(path: Path) -> Dict[str, List[str]]:
-    v, n = [], []
-    doc = Document(str(path))
-    full_text = []
-    hidden_runs = 0
-    seen_excerpts = set()  # prevent duplicate entries
+    return run_checks([
+        ("hidden_text", hidden_text), ("contrast", contrast), ("zero_width", zero_width),
+        ("transparency", transparency), ("image_contrast", image_contrast), ("ocr", ocr),
+    ])
+
+
+def scan_docx(path: Path, data: bytes = None) -> Dict[str, List[str]]:
+    doc = Document(io.BytesIO(data) if data is not None else str(path))
 
     def iter_all_paragraphs(doc):
         # Body paragraphs
@@ -317,109 +852,153 @@ def scan_docx(path: Path) -> Dict[str, List[str]]:
                         for p in cell.paragraphs:  # fixed: iterate paragraphs, not undefined p
                             yield p
 
-    for para in iter_all_paragraphs(doc):
-        full_text.append(para.text)
-        for run in para.runs:
-            t = run.text
-            fg_hex = resolve_run_fg_hex(run, THEME_MAP)
-            if not fg_hex:
-                fg_hex = THEME_MAP[MSO_THEME_COLOR.TEXT_1]  # default to black
+    paragraphs = list(iter_all_paragraphs(doc))
 
-            # Count hidden runs
-            try:
-                if run.font.hidden:
-                    hidden_runs += 1
-            except Exception:
-                pass
+    # hidden/zero-width characters
+    def zero_width(v, n):
+        text_all = "\n".join(para.text for para in paragraphs)
+        hidden_count, highlighted = detect_hidden_chars(text_all)
+        if hidden_count:
+            v.append(f"DOCX hidden/zero-width text: {hidden_count} occurrences ")
+            n.append("DOCX text excerpt:\n" + highlighted[:800] + ("...\n" if len(highlighted) > 800 else ""))
 
-            text = t.strip()
-            if not text:
-                continue
+    def hidden_runs(v, n):
+        count = 0
+        for para in paragraphs:
+            for run in para.runs:
+                try:
+                    if run.font.hidden:
+                        count += 1
+                except Exception:
+                    pass
+        if count:
+            v.append(f"DOCX hidden text runs: {count} ")
 
-            # Contrast check
-            ratio = contrast_ratio(fg_hex, "#ffffff")
-            if ratio < CONTRAST_THRESHOLD:
-                key = (fg_hex, text)
-                if key not in seen_excerpts:
-                    seen_excerpts.add(key)
+    def contrast(v, n):
+        seen_excerpts = set()  # prevent duplicate entries
+        groups = FindingGroups()
+        for para in paragraphs:
+            for run in para.runs:
+                text = run.text.strip()
+                if not text:
+                    continue
+                fg_hex = resolve_run_fg_hex(run, THEME_MAP)
+                if not fg_hex:
+                    fg_hex = THEME_MAP[MSO_THEME_COLOR.TEXT_1]  # default to black
+                ratio = contrast_ratio(fg_hex, "#ffffff")
+                if ratio >= CONTRAST_THRESHOLD:
+                    continue
+                if DETAIL != "full":
+                    groups.add(fg_hex, sample=text[:300])
+                elif (fg_hex, text) not in seen_excerpts:
+                    seen_excerpts.add((fg_hex, text))
                     v.append(f"DOCX low-contrast text: {fg_hex} on #ffffff")
                     n.append(f"Excerpt: {text}")
+        for fg_hex, g in groups.items():
+            v.append(f"DOCX low-contrast text: {fg_hex} on #ffffff ({g['count']} occurrences) ")
+            n.extend(f"Excerpt: {t}" for _, t in g["samples"])
 
-    if hidden_runs:
-        v.append(f"DOCX hidden text runs: {hidden_runs} ")
+    # images: transparency, baked-in contrast, OCR
+    analyzed = {}
+    max_pixels = image_pixel_limit(path)
 
-    # hidden/zero-width characters
-    text_all = "\n".join(full_text)
-    hidden_count, highlighted = detect_hidden_chars(text_all)
-    if hidden_count:
-        v.append(f"DOCX hidden/zero-width text: {hidden_count} occurrences ")
-        n.append("DOCX text excerpt:\n" + highlighted[:800] + ("...\n" if len(highlighted) > 800 else ""))
-
-    # images: transparency + OCR
-    for rel in doc.part.rels.values():
-        if "image" in rel.target_ref:
-            img_bytes = rel.target_part.blob
-            has_trans, ratio = detect_transparency(img_bytes)
+    def images():
+        for rel_id, rel in doc.part.rels.items():
+            if "image" in rel.target_ref:
+                yield rel_id, rel.target_part.blob
+
+    def transparency(v, n):
+        for _, img_bytes in images():
+            has_trans, ratio = detect_transparency(img_bytes, max_pixels)
             if has_trans:
                 v.append(f"DOCX image transparency: {ratio*100:.2f}% ")
-            ocr = ocr_image_bytes(img_bytes)
-            if ocr:
-                cleaned_ocr = ocr[:300].replace("\n", " ")
+
+    def image_contrast(v, n):
+        groups = FindingGroups()
+        for rel_id, img_bytes in images():
+            for item in _analyzed(analyzed, rel_id, img_bytes, max_pixels)[1]:
+                if DETAIL == "full":
+                    v.append(f"DOCX image low-contrast text: {item['fg']} on {item['bg']} "
+                             f"(ratio {item['ratio']:.2f}) ")
+                    n.append(f"Excerpt (image): {item['text'][:300]}")
+                else:
+                    groups.add((item["fg"], item["bg"]), sample=item["text"][:300], ratio=item["ratio"])
+        for (fg_hex, bg_hex), g in groups.items():
+            v.append(f"DOCX image low-contrast text: {fg_hex} on {bg_hex} (ratio {g['ratio']:.2f}) "
+                     f"({g['count']} occurrences) ")
+            n.extend(f"Excerpt (image): {t}" for _, t in g["samples"])
+
+    def ocr(v, n):
+        for rel_id, img_bytes in images():
+            text = _analyzed(analyzed, rel_id, img_bytes, max_pixels)[0]
+            if text is None:
+                n.append(f"DOCX image too large to OCR (over {max_pixels:,} pixels).")
+            elif text:
+                cleaned_ocr = text[:300].replace("\n", " ")
                 n.append("DOCX image OCR text: " + cleaned_ocr)
 
-    return {"violations": v, "notes": n}
+    return run_checks([
+        ("zero_width", zero_width), ("hidden_runs", hidden_runs), ("contrast", contrast),
+        ("transparency", transparency), ("image_contrast", image_contrast), ("ocr", ocr),
+    ])
 
 
-def scan_html(path: Path) -> Dict[str, List[str]]:
-    v, n = [], []
-    html = path.read_text(encoding="utf-8", errors="ignore")
-    count, highlighted = detect_hidden_chars(html)
-    if count:
-        v.append(f"HTML hidden/zero-width characters: {count} ")
-        n.append("HTML excerpt:\n" + highlighted[:800] + ("\n..." if len(highlighted) > 800 else ""))
-    # Inline styles
-    for item in detect_low_contrast_in_text_blob(html):
-        v.append(f"Low-contrast inline style (ratio {item['ratio']:.2f}) ")
-        n.append("Inline snippet:\n" + item["snippet"])
-    for snip in detect_hidden_css(html):
-        v.append("Hidden CSS detected (inline) ")
-        n.append(snip)
-    # Embedded and linked CSS
-    soup = BeautifulSoup(html, "html.parser")
-    for style in soup.find_all("style"):
-        findings = analyze_css(style.get_text(), "embedded CSS")
-        for it in findings:
-            if it["type"] == "low_contrast":
-                v.append(f"Low-contrast CSS selector {it['selector']} (ratio {it['ratio']:.2f}) ")
-                n.append(it["snippet"])
-            elif it["type"] == "hidden_css":
-                v.append(f"Hidden CSS {it['selector']} ")
-                n.append(it["snippet"])
-    for link in soup.find_all("link", rel=lambda v: v and "stylesheet" in v):
-        href = link.get("href")
-        if not href:
-            continue
-        css_path = (path.parent / href).resolve()
-        if css_path.exists() and css_path.is_file():
-            css_text = css_path.read_text(encoding="utf-8", errors="ignore")
-            findings = analyze_css(css_text, href)
+def scan_html(path: Path, data: bytes = None) -> Dict[str, List[str]]:
+    html = _read_text(path, data)
+
+    def zero_width(v, n):
+        count, highlighted = detect_hidden_chars(html)
+        if count:
+            v.append(f"HTML hidden/zero-width characters: {count} ")
+            n.append("HTML excerpt:\n" + highlighted[:800] + ("\n..." if len(highlighted) > 800 else ""))
+
+    def css(v, n):
+        # Inline styles
+        for item in detect_low_contrast_in_text_blob(html):
+            v.append(f"Low-contrast inline style (ratio {item['ratio']:.2f}) ")
+            n.append("Inline snippet:\n" + item["snippet"])
+        for snip in detect_hidden_css(html):
+            v.append("Hidden CSS detected (inline) ")
+            n.append(snip)
+        # Embedded and linked CSS
+        soup = BeautifulSoup(html, "html.parser")
+        for style in soup.find_all("style"):
+            findings = analyze_css(style.get_text(), "embedded CSS")
             for it in findings:
                 if it["type"] == "low_contrast":
-                    v.append(f"Low-contrast CSS {it['selector']} (ratio {it['ratio']:.2f}) in {href} ")
+                    v.append(f"Low-contrast CSS selector {it['selector']} (ratio {it['ratio']:.2f}) ")
                     n.append(it["snippet"])
                 elif it["type"] == "hidden_css":
-                    v.append(f"Hidden CSS {it['selector']} in {href} ")
+                    v.append(f"Hidden CSS {it['selector']} ")
                     n.append(it["snippet"])
-    return {"violations": v, "notes": n}
+        # Linked stylesheets only resolve for real files, not archive/email members
+        links = soup.find_all("link", rel=lambda v: v and "stylesheet" in v) if path.is_file() else []
+        for link in links:
+            href = link.get("href")
+            if not href:
+                continue
+            css_path = (path.parent / href).resolve()
+            if css_path.exists() and css_path.is_file():
+                css_text = css_path.read_text(encoding="utf-8", errors="ignore")
+                findings = analyze_css(css_text, href)
+                for it in findings:
+                    if it["type"] == "low_contrast":
+                        v.append(f"Low-contrast CSS {it['selector']} (ratio {it['ratio']:.2f}) in {href} ")
+                        n.append(it["snippet"])
+                    elif it["type"] == "hidden_css":
+                        v.append(f"Hidden CSS {it['selector']} in {href} ")
+                        n.append(it["snippet"])
 
+    return run_checks([("zero_width", zero_width), ("css", css)])
 
-def scan_psd(path: Path) -> Dict[str, List[str]]:
+
+def scan_psd(path: Path, data: bytes = None) -> Dict[str, List[str]]:
     v, n = [], []
     if not PSD_AVAILABLE:
         n.append("psd-tools not installed; PSD layer scan skipped.")
         return {"violations": v, "notes": n}
     try:
-        psd = PSDImage.open(str(path))
+        psd = PSDImage.open(io.BytesIO(data) if data is not None else str(path))
     except Exception as e:
         n.append(f"PSD parse failed: {e}")
         return {"violations": v, "notes": n}
@@ -439,30 +1018,59 @@ def scan_psd(path: Path) -> Dict[str, List[str]]:
     return {"violations": v, "notes": n}
 
 
-def scan_image(path: Path) -> Dict[str, List[str]]:
-    v, n = [], []
-    has_trans, ratio = detect_transparency(path)
-    if has_trans:
-        v.append(f"Image transparency: {ratio*100:.2f}% ")
-    exif = scan_exif(path)
-    for line in exif:
-        n.append(f"EXIF {line}")
-    ocr = ocr_image_path(path)
-    if ocr:
-        image_ocr_excerpt = ocr[:300].replace("\n", " ")
-        n.append(f"Image OCR text: {image_ocr_excerpt}")
-        # n.append(f"DOCX image OCR text: {ocr[:300].replace('\n', ' ')}")  issue in python 3.10
-    return {"violations": v, "notes": n}
+def scan_image(path: Path, data: bytes = None) -> Dict[str, List[str]]:
+    source = data if data is not None else path
+    analyzed = {}
+    max_pixels = image_pixel_limit(path)
 
+    def transparency(v, n):
+        has_trans, ratio = detect_transparency(source, max_pixels)
+        if has_trans:
+            v.append(f"Image transparency: {ratio*100:.2f}% ")
 
-def scan_text_or_css(path: Path) -> Dict[str, List[str]]:
-    v, n = [], []
-    text = path.read_text(encoding="utf-8", errors="ignore")
-    count, highlighted = detect_hidden_chars(text)
-    if count:
-        v.append(f"{path.suffix.upper()} hidden/zero-width text: {count} ")
-        n.append("Excerpt:\n" + highlighted[:800] + ("\n..." if len(highlighted) > 800 else ""))
-    if path.suffix.lower() == ".css":
+    def image_contrast(v, n):
+        groups = FindingGroups()
+        for item in _analyzed(analyzed, path, source, max_pixels)[1]:
+            if DETAIL == "full":
+                v.append(f"Image low-contrast text: {item['fg']} on {item['bg']} (ratio {item['ratio']:.2f}) ")
+                n.append(f"Excerpt: {item['text'][:300]}")
+            else:
+                groups.add((item["fg"], item["bg"]), sample=item["text"][:300], ratio=item["ratio"])
+        for (fg_hex, bg_hex), g in groups.items():
+            v.append(f"Image low-contrast text: {fg_hex} on {bg_hex} (ratio {g['ratio']:.2f}) "
+                     f"({g['count']} occurrences) ")
+            n.extend(f"Excerpt: {t}" for _, t in g["samples"])
+
+    def exif(v, n):
+        for line in scan_exif(path, data):
+            n.append(f"EXIF {line}")
+
+    def ocr(v, n):
+        text = _analyzed(analyzed, path, source, max_pixels)[0]
+        if text is None:
+            n.append(f"Image too large to OCR (over {max_pixels:,} pixels).")
+        elif text:
+            image_ocr_excerpt = text[:300].replace("\n", " ")
+            n.append(f"Image OCR text: {image_ocr_excerpt}")
+            # n.append(f"DOCX image OCR text: {ocr[:300].replace('\n', ' ')}")  issue in python 3.10
+
+    return run_checks([
+        ("transparency", transparency), ("image_contrast", image_contrast), ("exif", exif), ("ocr", ocr),
+    ])
+
+
+def scan_text_or_css(path: Path, data: bytes = None) -> Dict[str, List[str]]:
+    text = _read_text(path, data)
+
+    def zero_width(v, n):
+        count, highlighted = detect_hidden_chars(text)
+        if count:
+            v.append(f"{path.suffix.upper()} hidden/zero-width text: {count} ")
+            n.append("Excerpt:\n" + highlighted[:800] + ("\n..." if len(highlighted) > 800 else ""))
+
+    def css(v, n):
+        if path.suffix.lower() != ".css":
+            return
         findings = analyze_css(text, str(path))
         for it in findings:
             if it["type"] == "low_contrast":
@@ -471,41 +1079,241 @@ def scan_text_or_css(path: Path) -> Dict[str, List[str]]:
             elif it["type"] == "hidden_css":
                 v.append(f"Hidden CSS {it['selector']} ")
                 n.append(it["snippet"])
-    return {"violations": v, "notes": n}
+
+    return run_checks([("zero_width", zero_width), ("css", css)])
 
 
-def scan_file(path: Path) -> Dict[str, List[str]]:
+def scan_file(path: Path, data: bytes = None) -> Dict[str, List[str]]:
     #print(f"DEBUG: scan_file called for {path} with ext={path.suffix.lower()}")
     ext = path.suffix.lower().strip()
+    if ext in CONTAINER_EXTS:
+        return flatten_results(scan_container(path, data))
     if ext in IMAGE_EXTS:
-        return scan_image(path)
+        return scan_image(path, data)
     if ext in TEXT_EXTS:
-        return scan_text_or_css(path)
+        return scan_text_or_css(path, data)
     if ext in HTML_EXTS:
-        return scan_html(path)
+        return scan_html(path, data)
     if ext == ".pdf":
-        return scan_pdf(path)
+        return scan_pdf(path, data)
     if ext == ".docx":
-        return scan_docx(path)
+        return scan_docx(path, data)
     if ext in PSD_EXTS:
-        return scan_psd(path)
+        return scan_psd(path, data)
     if ext in AI_EXTS:
         try:
-            with open(path, "rb") as f:
-                header = f.read(4)
+            if data is not None:
+                header = data[:4]
+            else:
+                with open(path, "rb") as f:
+                    header = f.read(4)
             if header.startswith(b"%PDF"):
-                return scan_pdf(path)
+                return scan_pdf(path, data)
         except Exception:
             pass
         return {"violations": [], "notes": ["AI file not PDF-compatible; deep scan skipped."]}
     return {"violations": [], "notes": [f"Unsupported file type: {ext}"]}
 
 
+def _zip_members(path: Path, data: bytes, budget: Dict[str, int], notes: List[str]):
+    with zipfile.ZipFile(io.BytesIO(data) if data is not None else path) as zf:
+        for info in zf.infolist():
+            if info.is_dir():
+                continue
+            if budget["members"] >= MAX_CONTAINER_MEMBERS:
+                notes.append(f"Archive member limit ({MAX_CONTAINER_MEMBERS}) reached; remaining members skipped.")
+                return
+            remaining = MAX_CONTAINER_BYTES - budget["bytes"]
+            if info.file_size > remaining:
+                notes.append(f"Archive size limit reached at {info.filename}; remaining members skipped.")
+                return
+            try:
+                # Read at most one byte past the budget so a lying header cannot inflate us
+                with zf.open(info) as fh:
+                    blob = fh.read(remaining + 1)
+            except Exception as e:
+                notes.append(f"Archive member {info.filename} unreadable: {e}")
+                continue
+            if len(blob) > remaining:
+                notes.append(f"Archive size limit reached at {info.filename}; remaining members skipped.")
+                return
+            budget["members"] += 1
+            budget["bytes"] += len(blob)
+            yield info.filename, blob
+
+
+def _email_parts(path: Path, data: bytes, budget: Dict[str, int], notes: List[str]):
+    raw = data if data is not None else path.read_bytes()
+    msg = email.message_from_bytes(raw, policy=email.policy.default)
+    for index, part in enumerate(msg.walk()):
+        if part.is_multipart():
+            continue
+        name = part.get_filename()
+        ctype = part.get_content_type()
+        if not name:
+            if ctype == "text/html":
+                name = f"body{index}.html"
+            elif ctype == "text/plain":
+                name = f"body{index}.txt"
+            else:
+                continue
+        if budget["members"] >= MAX_CONTAINER_MEMBERS:
+            notes.append(f"Email part limit ({MAX_CONTAINER_MEMBERS}) reached; remaining parts skipped.")
+            return
+        blob = part.get_payload(decode=True) or b""
+        if budget["bytes"] + len(blob) > MAX_CONTAINER_BYTES:
+            notes.append(f"Email size limit reached at {name}; remaining parts skipped.")
+            return
+        budget["members"] += 1
+        budget["bytes"] += len(blob)
+        yield name, blob
+
+
+def scan_container(path: Path, data: bytes = None, depth: int = 0,
+                   budget: Dict[str, int] = None) -> List[Tuple[Path, Dict[str, List[str]]]]:
+    """Scan ZIP/EML members in memory; results are keyed by nested paths like bundle.zip!/offer.docx."""
+    budget = budget if budget is not None else {"members": 0, "bytes": 0}
+    results, notes = [], []
+    members = _email_parts if path.suffix.lower() in EMAIL_EXTS else _zip_members
+    try:
+        for name, blob in members(path, data, budget, notes):
+            member_path = Path(f"{path}!/{name.lstrip('/')}")
+            if member_path.suffix.lower() in CONTAINER_EXTS:
+                if depth + 1 >= MAX_CONTAINER_DEPTH:
+                    notes.append(f"Nesting depth limit ({MAX_CONTAINER_DEPTH}) reached; {name} skipped.")
+                    continue
+                nested = scan_container(member_path, blob, depth + 1, budget)
+                results.extend(nested)
+                if any(is_blocking(r) for _, r in nested):
+                    notes.append(f"Fail-fast: stopped at {name}; remaining members skipped.")
+                    break
+                continue
+            try:
+                results.append((member_path, scan_file(member_path, blob)))
+            except Exception as e:
+                results.append((member_path, {"violations": [], "notes": [f"Scan failed: {e}"]}))
+            if is_blocking(results[-1][1]):
+                notes.append(f"Fail-fast: stopped at {name}; remaining members skipped.")
+                break
+    except Exception as e:
+        notes.append(f"Container could not be opened: {e}")
+    if notes:
+        results.insert(0, (path, {"violations": [], "notes": notes}))
+    return results
+
+
+def flatten_results(pairs: List[Tuple[Path, Dict[str, List[str]]]]) -> Dict[str, List[str]]:
+    v, n = [], []
+    for p, r in pairs:
+        v.extend(f"{p}: {line}" for line in r.get("violations", []))
+        n.extend(f"{p}: {line}" for line in r.get("notes", []))
+    return {"violations": v, "notes": n}
+
+
+def scan_entries(path: Path, data: bytes = None) -> List[Tuple[Path, Dict[str, List[str]]]]:
+    """Like scan_file, but containers expand into one result per member."""
+    if path.suffix.lower() in CONTAINER_EXTS:
+        return scan_container(path, data)
+    return [(path, scan_file(path, data))]
+
+
+class _ByteBudget:
+    """Byte budget shared by prefetch reads, granted strictly in submission order.
+
+    In-order grants mean the file the consumer waits on next can always get its bytes:
+    everything ahead of it has been yielded and released.
+    """
+
+    def __init__(self, limit: int):
+        self.cond = threading.Condition()
+        self.free = limit
+        self.next_ticket = 0
+        self.closed = False
+
+    def acquire(self, ticket: int, size: int) -> bool:
+        with self.cond:
+            self.cond.wait_for(lambda: self.closed or (self.next_ticket == ticket and self.free >= size))
+            if self.closed:
+                return False
+            self.free -= size
+            self.next_ticket += 1
+            self.cond.notify_all()
+            return True
+
+    def release(self, size: int):
+        with self.cond:
+            self.free += size
+            self.cond.notify_all()
+
+    def close(self):
+        with self.cond:
+            self.closed = True
+            self.cond.notify_all()
+
+
+def _prefetch_read(path: Path, ticket: int, budget: _ByteBudget, max_bytes: int) -> Tuple[Optional[bytes], int]:
+    # Runs on a prefetch worker, so stat() round trips on network shares overlap with parsing.
+    # Returns (bytes or None, bytes still held against the budget).
+    try:
+        size = path.stat().st_size
+    except OSError:
+        size = None
+    if size is None or size > max_bytes:
+        budget.acquire(ticket, 0)
+        return None, 0
+    if not budget.acquire(ticket, size):
+        return None, 0
+    try:
+        with open(path, "rb") as f:
+            data = f.read(size + 1)
+    except OSError:
+        data = None  # let the scanner open it and report the error itself
+    if data is None or len(data) > size:
+        budget.release(size)  # unreadable, or grew since stat(): the scanner reads it itself
+        return None, 0
+    budget.release(size - len(data))
+    return data, len(data)
+
+
+def prefetch_files(paths: Iterable[Path], max_bytes: int = None,
+                   workers: int = None) -> Iterator[Tuple[Path, Optional[bytes]]]:
+    """Yield (path, bytes) in order while stat-ing and reading upcoming files on a thread pool.
+
+    Buffered bytes stay under max_bytes; files bigger than the budget come back with
+    None so the scanner reads them itself.
+    """
+    max_bytes = max_bytes or PREFETCH_BYTES
+    budget = _ByteBudget(max_bytes)
+    pending = deque()  # (path, future)
+
+    def take():
+        done_path, future = pending.popleft()
+        data, held = future.result()
+        budget.release(held)
+        return done_path, data
+
+    with ThreadPoolExecutor(max_workers=workers or PREFETCH_WORKERS) as pool:
+        try:
+            for ticket, path in enumerate(paths):
+                if len(pending) >= PREFETCH_DEPTH:
+                    yield take()
+                pending.append((path, pool.submit(_prefetch_read, path, ticket, budget, max_bytes)))
+            while pending:
+                yield take()
+        finally:
+            # Abandoned early (fail-fast): wake any reads still waiting for budget
+            budget.close()
+            for _, future in pending:
+                future.cancel()
+
+
 def scan_directory(dir_path: Path) -> List[Tuple[Path, Dict[str, List[str]]]]:
     #print(f"DEBUG: scan_directory called for {dir_path} with ext={dir_path.suffix.lower()}")
     results = []
-    for root, _, files in os.walk(dir_path):
-        for name in files:
-            fp = Path(root) / name
-            results.append((fp, scan_file(fp)))
+    paths = (Path(root) / name for root, _, files in os.walk(dir_path) for name in files)
+    for fp, data in prefetch_files(paths):
+        entries = scan_entries(fp, data)
+        results.extend(entries)
+        if any(is_blocking(r) for _, r in entries):
+            break  # fail-fast: the run already has its answer
     return results
@@ -0,0 +1,323 @@
+# service.py
+import hmac
+import http.client
+import json
+import os
+import secrets
+import socket
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from http.server import BaseHTTPRequestHandler, HTTPServer, ThreadingHTTPServer
+from pathlib import Path
+from socketserver import ThreadingMixIn
+from typing import Dict, List, Optional, Tuple
+
+from hrules.report import to_record, from_record
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+DEFAULT_WORKERS = max(1, min(8, (os.cpu_count() or 2) - 1))
+BATCH_SIZE = 8               # files per worker task for multi-file requests
+PENDING_PER_WORKER = 4       # queued tasks per worker
+QUEUE_TIMEOUT = 10           # seconds a batch waits for a queue slot before we answer 503
+MAX_UPLOAD_BYTES = 200 * 1024 * 1024
+CLIENT_TIMEOUT = 600
+CLIENT_RETRIES = 5           # attempts while the service answers 503
+# TCP clients must send this (0600) file's token; the Unix socket relies on its own 0600 mode
+DEFAULT_TOKEN_FILE = Path.home() / ".hrules_service_token"
+LOCAL_HOSTS = {"127.0.0.1", "localhost", "::1"}
+
+
+def write_token(token_file: Path) -> str:
+    token = secrets.token_urlsafe(32)
+    fd = os.open(token_file, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, "w") as f:
+        f.write(token)
+    os.chmod(token_file, 0o600)
+    return token
+
+
+def read_token(token_file: Path) -> Optional[str]:
+    try:
+        return Path(token_file).read_text().strip() or None
+    except OSError:
+        return None
+
+
+def _warm_worker(options: Dict):
+    # Runs once per worker process: apply the server's scan options and pay the
+    # Tesseract start-up cost here instead of on the first request. The scanner is
+    # imported only where scans run, so --client stays a light import.
+    from hrules import scanner
+    for name, value in options.items():
+        setattr(scanner, name, value)
+    try:
+        scanner.pytesseract.get_tesseract_version()
+    except Exception:
+        pass
+
+
+def _scan_batch(jobs: List[Tuple[str, Optional[bytes]]]) -> List[Dict]:
+    from hrules import scanner
+    records = []
+    for path, data in jobs:
+        try:
+            pairs = scanner.scan_entries(Path(path), data)
+        except Exception as e:
+            pairs = [(Path(path), {"violations": [], "notes": [f"Scan failed: {e}"]})]
+        records.extend(to_record(p, r) for p, r in pairs)
+    return records
+
+
+class Busy(Exception):
+    pass
+
+
+class ScanService:
+    """Warm worker pool with a bounded queue; submit() raises Busy when the queue stays full."""
+
+    def __init__(self, workers: int = None):
+        from hrules import scanner
+        self.workers = workers or DEFAULT_WORKERS
+        self.options = {"PDF_RASTER_BACKGROUND": scanner.PDF_RASTER_BACKGROUND,
+                        "FAIL_FAST_SEVERITY": scanner.FAIL_FAST_SEVERITY,
+                        "DETAIL": scanner.DETAIL}
+        self.slots = threading.BoundedSemaphore(self.workers * PENDING_PER_WORKER)
+        self._restart_lock = threading.Lock()
+        self.pool = self._start_pool()
+
+    def _start_pool(self) -> ProcessPoolExecutor:
+        pool = ProcessPoolExecutor(max_workers=self.workers, initializer=_warm_worker,
+                                   initargs=(self.options,))
+        # Start every worker now rather than on first use
+        for f in [pool.submit(_scan_batch, []) for _ in range(self.workers)]:
+            f.result()
+        return pool
+
+    def _restart(self, broken: ProcessPoolExecutor):
+        # A worker died (e.g. killed for memory on a huge upload), which breaks the
+        # whole pool; replace it once, however many requests notice at the same time.
+        with self._restart_lock:
+            if self.pool is broken:
+                broken.shutdown(wait=False, cancel_futures=True)
+                self.pool = self._start_pool()
+
+    def _submit_batch(self, batch: List[Tuple[str, Optional[bytes]]]):
+        """(pool, future); a pool already broken by an earlier request is replaced first."""
+        pool = self.pool
+        try:
+            return pool, pool.submit(_scan_batch, batch)
+        except BrokenProcessPool:
+            self._restart(pool)
+        pool = self.pool
+        return pool, pool.submit(_scan_batch, batch)
+
+    def submit(self, jobs: List[Tuple[str, Optional[bytes]]]) -> List[Dict]:
+        # Batches take a queue slot as they are submitted, so a request of any size
+        # streams through; only a queue that stays full for QUEUE_TIMEOUT is refused.
+        futures, pools = [], set()
+        try:
+            for i in range(0, len(jobs), BATCH_SIZE):
+                if not self.slots.acquire(timeout=QUEUE_TIMEOUT):
+                    raise Busy(f"{self.workers} workers saturated")
+                try:
+                    pool, future = self._submit_batch(jobs[i:i + BATCH_SIZE])
+                except BaseException:
+                    self.slots.release()
+                    raise
+                future.add_done_callback(lambda _: self.slots.release())
+                futures.append(future)
+                pools.add(pool)
+        except BaseException:
+            for future in futures:
+                future.cancel()
+            raise
+        records = []
+        try:
+            for future in futures:
+                records.extend(future.result())
+        except BrokenProcessPool:
+            # This request is lost with the worker; later ones get a fresh pool
+            for pool in pools:
+                self._restart(pool)
+            raise
+        return records
+
+    def close(self):
+        self.pool.shutdown(cancel_futures=True)
+
+
+def _expand(paths: List[str]) -> List[Tuple[str, None]]:
+    jobs = []
+    for p in paths:
+        path = Path(p)
+        if path.is_dir():
+            jobs.extend((str(Path(r) / name), None) for r, _, files in os.walk(path) for name in sorted(files))
+        else:
+            jobs.append((str(path), None))
+    return jobs
+
+
+class ScanHandler(BaseHTTPRequestHandler):
+    """GET /health; POST /scan with {"paths": [...]} or raw bytes plus an X-Filename header.
+
+    Over TCP every request needs a local Host header (no DNS rebinding) and the
+    service token as "Authorization: Bearer <token>".
+    """
+
+    service: ScanService = None
+    token: Optional[str] = None
+    allowed_hosts = LOCAL_HOSTS
+
+    def _reply(self, status: int, payload: Dict, headers: Dict = None):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _authorized(self) -> bool:
+        if self.token is None:
+            return True
+        host = (self.headers.get("Host") or "").rsplit(":", 1)[0].strip("[]").lower()
+        if host not in self.allowed_hosts:
+            return False
+        auth = self.headers.get("Authorization") or ""
+        return hmac.compare_digest(auth.encode("utf-8"), f"Bearer {self.token}".encode("utf-8"))
+
+    def do_GET(self):
+        if not self._authorized():
+            return self._reply(403, {"error": "forbidden"})
+        if self.path != "/health":
+            return self._reply(404, {"error": "not found"})
+        self._reply(200, {"status": "ok", "workers": self.service.workers})
+
+    def do_POST(self):
+        if not self._authorized():
+            return self._reply(403, {"error": "forbidden"})
+        if self.path != "/scan":
+            return self._reply(404, {"error": "not found"})
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+        except ValueError:
+            length = -1
+        if length < 0:
+            return self._reply(400, {"error": "bad Content-Length"})
+        if length > MAX_UPLOAD_BYTES:
+            return self._reply(413, {"error": f"upload exceeds {MAX_UPLOAD_BYTES} bytes"})
+        body = self.rfile.read(length)
+        filename = self.headers.get("X-Filename")
+        try:
+            if filename:
+                # Uploads are not on disk; label them like archive members
+                jobs = [(f"upload!/{Path(filename).name}", body)]
+            else:
+                jobs = _expand(json.loads(body or b"{}").get("paths", []))
+        except (ValueError, AttributeError) as e:
+            return self._reply(400, {"error": f"bad request: {e}"})
+        try:
+            records = self.service.submit(jobs)
+        except Busy as e:
+            return self._reply(503, {"error": str(e)}, {"Retry-After": "1"})
+        except Exception as e:
+            return self._reply(500, {"error": f"scan failed: {e}"})
+        self._reply(200, {"results": records})
+
+    def address_string(self):
+        return str(self.client_address[0]) if self.client_address else "unix"
+
+    def log_message(self, format, *args):
+        pass
+
+
+class UnixHTTPServer(ThreadingMixIn, HTTPServer):
+    address_family = socket.AF_UNIX
+    daemon_threads = True
+
+    def server_bind(self):
+        if os.path.exists(self.server_address):
+            os.unlink(self.server_address)
+        self.socket.bind(self.server_address)
+        os.chmod(self.server_address, 0o600)
+        self.server_name, self.server_port = "localhost", 0
+
+
+def make_server(service: ScanService, host: str = None, port: int = None, socket_path: str = None,
+                token: str = None):
+    """Unix socket server, or a TCP server that requires token (a random one when not given)."""
+    if socket_path:
+        handler = type("BoundScanHandler", (ScanHandler,), {"service": service})
+        return UnixHTTPServer(socket_path, handler)
+    host = host or DEFAULT_HOST
+    handler = type("BoundScanHandler", (ScanHandler,), {
+        "service": service, "token": token or secrets.token_urlsafe(32),
+        "allowed_hosts": LOCAL_HOSTS | {host.lower()}})
+    server = ThreadingHTTPServer((host, DEFAULT_PORT if port is None else port), handler)
+    server.token = handler.token
+    return server
+
+
+def serve(host: str = None, port: int = None, socket_path: str = None, workers: int = None,
+          token_file: Path = None) -> None:
+    service = ScanService(workers)
+    token = None if socket_path else write_token(token_file or DEFAULT_TOKEN_FILE)
+    server = make_server(service, host, port, socket_path, token)
+    where = socket_path or f"http://{server.server_address[0]}:{server.server_address[1]}"
+    print(f"[+] hrules service listening on {where} with {service.workers} warm worker(s)")
+    if token:
+        print(f"[+] Clients authenticate with the token in {token_file or DEFAULT_TOKEN_FILE}")
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        service.close()
+        if socket_path and os.path.exists(socket_path):
+            os.unlink(socket_path)
+
+
+class _UnixConnection(http.client.HTTPConnection):
+    def __init__(self, socket_path: str, timeout: float):
+        super().__init__("localhost", timeout=timeout)
+        self.socket_path = socket_path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.socket_path)
+
+
+def scan_via_service(paths: List[Path], host: str = None, port: int = None, socket_path: str = None,
+                     token: str = None, token_file: Path = None) -> Optional[List[Tuple[Path, Dict[str, List[str]]]]]:
+    """Scan through a running service; None when no service is reachable (or it stays busy)."""
+    body = json.dumps({"paths": [str(p.resolve()) for p in paths]})
+    headers = {"Content-Type": "application/json"}
+    if not socket_path:
+        token = token or read_token(token_file or DEFAULT_TOKEN_FILE)
+        if not token:
+            return None
+        headers["Authorization"] = f"Bearer {token}"
+    for _ in range(CLIENT_RETRIES):
+        if socket_path:
+            conn = _UnixConnection(socket_path, CLIENT_TIMEOUT)
+        else:
+            conn = http.client.HTTPConnection(host or DEFAULT_HOST, port or DEFAULT_PORT, timeout=CLIENT_TIMEOUT)
+        try:
+            conn.request("POST", "/scan", body=body, headers=headers)
+            resp = conn.getresponse()
+            payload = json.loads(resp.read() or b"{}")
+        except (OSError, ValueError, http.client.HTTPException):
+            return None
+        finally:
+            conn.close()
+        if resp.status == 503:
+            time.sleep(float(resp.getheader("Retry-After") or 1))
+            continue
+        if resp.status != 200:
+            return None
+        return [from_record(rec) for rec in payload.get("results", [])]
+    return None
@@ -0,0 +1,120 @@
+# shards.py
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Dict, Iterable, List, Set, Tuple
+
+from hrules.scanner import scan_entries, prefetch_files, is_blocking
+from hrules.report import to_record, from_record
+
+
+def parse_shard(spec: str) -> Tuple[int, int]:
+    """'2/4' -> (2, 4); shards are numbered 1..N."""
+    error = ValueError(f"invalid shard {spec!r}; expected i/N with 1 <= i <= N")
+    try:
+        index, count = (int(part) for part in spec.split("/", 1))
+    except ValueError:
+        raise error from None
+    if count < 1 or not 1 <= index <= count:
+        raise error
+    return index, count
+
+
+def build_manifest(dir_path: Path) -> List[str]:
+    """Sorted POSIX paths of every file under dir_path, relative to it."""
+    manifest = []
+    for root, dirs, files in os.walk(dir_path):
+        dirs.sort()
+        for name in files:
+            manifest.append((Path(root) / name).relative_to(dir_path).as_posix())
+    manifest.sort()
+    return manifest
+
+
+def load_or_build_manifest(dir_path: Path, manifest_path: Path) -> List[str]:
+    # Reusing the saved manifest keeps shard membership stable across restarts
+    if manifest_path.exists():
+        return [ln for ln in manifest_path.read_text(encoding="utf-8").splitlines() if ln]
+    manifest = build_manifest(dir_path)
+    tmp = manifest_path.with_name(manifest_path.name + ".tmp")
+    tmp.write_text("\n".join(manifest) + "\n", encoding="utf-8")
+    os.replace(tmp, manifest_path)
+    return manifest
+
+
+def in_shard(rel_path: str, index: int, count: int) -> bool:
+    # Content hash, not hash(): must agree across machines and interpreter runs
+    digest = hashlib.sha1(rel_path.encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big") % count == index - 1
+
+
+def load_checkpoint(checkpoint_path: Path) -> Set[str]:
+    """Relative paths already recorded; a torn last line from a crash is ignored."""
+    done = set()
+    if not checkpoint_path.exists():
+        return done
+    with open(checkpoint_path, encoding="utf-8") as fh:
+        for line in fh:
+            try:
+                done.add(json.loads(line)["file"])
+            except (ValueError, KeyError):
+                continue
+    return done
+
+
+def _drop_torn_tail(checkpoint_path: Path) -> None:
+    # A crash mid-write leaves a partial line; cut it so the next append starts clean
+    if not checkpoint_path.exists():
+        return
+    with open(checkpoint_path, "rb+") as fh:
+        data = fh.read()
+        if data and not data.endswith(b"\n"):
+            fh.truncate(data.rfind(b"\n") + 1)
+
+
+def scan_shard(dir_path: Path, index: int, count: int, checkpoint_path: Path) -> Tuple[int, int]:
+    """Scan this shard's files not yet in the checkpoint. Returns (scanned, skipped)."""
+    manifest_path = checkpoint_path.with_name(checkpoint_path.name + ".manifest")
+    manifest = load_or_build_manifest(dir_path, manifest_path)
+    _drop_torn_tail(checkpoint_path)
+    done = load_checkpoint(checkpoint_path)
+    todo = [rel for rel in manifest if in_shard(rel, index, count)]
+    skipped = sum(1 for rel in todo if rel in done)
+    todo = [rel for rel in todo if rel not in done]
+    scanned = 0
+    with open(checkpoint_path, "a", encoding="utf-8") as out:
+        for fp, data in prefetch_files(dir_path / rel for rel in todo):
+            rel = fp.relative_to(dir_path).as_posix()
+            try:
+                pairs = scan_entries(fp, data)
+            except Exception as e:
+                pairs = [(fp, {"violations": [], "notes": [f"Scan failed: {e}"]})]
+            record = {"file": rel, "entries": [to_record(p, r) for p, r in pairs]}
+            out.write(json.dumps(record, ensure_ascii=False) + "\n")
+            out.flush()
+            scanned += 1
+            if any(is_blocking(r) for _, r in pairs):
+                break
+    return scanned, skipped
+
+
+def read_partial(checkpoint_path: Path) -> Iterable[Dict]:
+    with open(checkpoint_path, encoding="utf-8") as fh:
+        for line in fh:
+            try:
+                yield json.loads(line)
+            except ValueError:
+                continue
+
+
+def merge_partials(checkpoint_paths: List[Path]) -> List[Tuple[Path, Dict[str, List[str]]]]:
+    """Combine shard outputs into report pairs, ordered by manifest path."""
+    by_file = {}
+    for cp in checkpoint_paths:
+        for record in read_partial(cp):
+            by_file[record["file"]] = record["entries"]
+    pairs = []
+    for rel in sorted(by_file):
+        pairs.extend(from_record(entry) for entry in by_file[rel])
+    return pairs
@@ -0,0 +1,119 @@
+# store.py
+import os
+import sqlite3
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+from hrules.scanner import classify_violation, SEVERITIES
+
+DEFAULT_STORE = "hrules_results.db"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE,
+    file_type TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS findings (
+    id INTEGER PRIMARY KEY,
+    file_id INTEGER NOT NULL REFERENCES files(id),
+    category TEXT NOT NULL,          -- 'violation' or 'note'
+    kind TEXT NOT NULL,
+    severity TEXT,
+    position INTEGER NOT NULL,
+    text TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_files_type ON files(file_type);
+CREATE INDEX IF NOT EXISTS idx_findings_file ON findings(file_id, category, position);
+CREATE INDEX IF NOT EXISTS idx_findings_kind ON findings(category, kind, severity);
+CREATE INDEX IF NOT EXISTS idx_findings_severity ON findings(category, severity);
+"""
+
+# Any string that sorts after every path with a given prefix, so prefix filters
+# become an index range scan instead of LIKE.
+_PREFIX_END = "\U0010ffff"
+
+
+def open_store(db_path: Path) -> sqlite3.Connection:
+    conn = sqlite3.connect(str(db_path))
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def save_results(conn: sqlite3.Connection, pairs: List[Tuple[Path, Dict[str, List[str]]]]) -> None:
+    """Insert or replace the findings for each path in one transaction."""
+    with conn:
+        for path, res in pairs:
+            key = str(path)
+            conn.execute("INSERT INTO files(path, file_type) VALUES (?, ?) "
+                         "ON CONFLICT(path) DO UPDATE SET file_type = excluded.file_type",
+                         (key, Path(key).suffix.lower()))
+            (file_id,) = conn.execute("SELECT id FROM files WHERE path = ?", (key,)).fetchone()
+            conn.execute("DELETE FROM findings WHERE file_id = ?", (file_id,))
+            rows = []
+            for i, v in enumerate(res.get("violations", [])):
+                kind, severity = classify_violation(v)
+                rows.append((file_id, "violation", kind, severity, i, v))
+            for i, n in enumerate(res.get("notes", [])):
+                rows.append((file_id, "note", "note", None, i, n))
+            conn.executemany("INSERT INTO findings(file_id, category, kind, severity, position, text) "
+                             "VALUES (?, ?, ?, ?, ?, ?)", rows)
+    # Refresh planner statistics so path-prefix vs kind filters pick the right index
+    conn.execute("PRAGMA optimize")
+
+
+def _where(kind: str = None, file_type: str = None, path_prefix: str = None,
+           severity: str = None) -> Tuple[str, List]:
+    clauses, params = ["f.category = 'violation'"], []
+    if kind:
+        clauses.append("f.kind = ?")
+        params.append(kind)
+    if severity:
+        allowed = SEVERITIES[SEVERITIES.index(severity):]
+        clauses.append(f"f.severity IN ({', '.join('?' * len(allowed))})")
+        params.extend(allowed)
+    if file_type:
+        clauses.append("d.file_type = ?")
+        params.append(file_type.lower() if file_type.startswith(".") else f".{file_type.lower()}")
+    if path_prefix:
+        # A directory boundary: /contracts matches /contracts and /contracts/..., not /contracts-old
+        base = path_prefix.rstrip("/" + os.sep)
+        clauses.append("(d.path = ? OR (d.path >= ? AND d.path < ?))")
+        params.extend([base, base + os.sep, base + os.sep + _PREFIX_END])
+    return " AND ".join(clauses), params
+
+
+def query_findings(conn: sqlite3.Connection, kind: str = None, file_type: str = None,
+                   path_prefix: str = None, severity: str = None,
+                   include_notes: bool = False) -> List[Tuple[Path, Dict[str, List[str]]]]:
+    """Matching violations as report pairs; include_notes adds every note of the matched files."""
+    where, params = _where(kind, file_type, path_prefix, severity)
+    rows = conn.execute(
+        f"SELECT d.id, d.path, f.text FROM findings f JOIN files d ON d.id = f.file_id "
+        f"WHERE {where} ORDER BY d.path, f.position", params)
+    results: Dict[int, Tuple[Path, Dict[str, List[str]]]] = {}
+    for file_id, path, text in rows:
+        if file_id not in results:
+            results[file_id] = (Path(path), {"violations": [], "notes": []})
+        results[file_id][1]["violations"].append(text)
+    if include_notes:
+        for file_id, (_, res) in results.items():
+            res["notes"] = [t for (t,) in conn.execute(
+                "SELECT text FROM findings WHERE file_id = ? AND category = 'note' ORDER BY position",
+                (file_id,))]
+    return list(results.values())
+
+
+def count_findings(conn: sqlite3.Connection, group_by: str = "kind", kind: str = None,
+                   file_type: str = None, path_prefix: str = None,
+                   severity: str = None) -> List[Tuple[str, int]]:
+    """Violation counts grouped by kind, severity or file type."""
+    column = {"kind": "f.kind", "severity": "f.severity", "type": "d.file_type"}[group_by]
+    where, params = _where(kind, file_type, path_prefix, severity)
+    # Counting straight off the findings indexes is much cheaper than joining every row
+    join = " JOIN files d ON d.id = f.file_id" if group_by == "type" or file_type or path_prefix else ""
+    return conn.execute(
+        f"SELECT {column}, COUNT(*) FROM findings f{join} "
+        f"WHERE {where} GROUP BY {column} ORDER BY COUNT(*) DESC", params).fetchall()
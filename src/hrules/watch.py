@@ -0,0 +1,343 @@
+# watch.py
+import ctypes
+import ctypes.util
+import errno
+import json
+import os
+import re
+import select
+import struct
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+
+from hrules.scanner import scan_entries, prefetch_files
+from hrules.report import to_record, from_record, write_report
+
+DEFAULT_STATE = "hrules_watch_state.json"
+DEBOUNCE_SECONDS = 2.0
+POLL_INTERVAL = 2.0
+# The report is a full rewrite, so while changes keep arriving it is rewritten at most
+# this often; the state file is an append-only journal updated on every batch.
+REPORT_INTERVAL = 10.0
+COMPACT_SLACK = 1000      # journal lines beyond 2x the live entries before compacting
+# inotify only sees changes made through this kernel, so trees on these are polled
+MOUNTS_FILE = "/proc/mounts"
+NETWORK_FILESYSTEMS = {"nfs", "nfs4", "cifs", "smb3", "smbfs", "9p", "afs", "ceph", "glusterfs",
+                       "fuse.glusterfs", "fuse.sshfs", "lustre"}
+
+# inotify(7) constants
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_DELETE_SELF
+EVENT_HEADER = struct.Struct("iIII")
+
+
+def _tmp_path(path: Path) -> Path:
+    return path.with_name(path.name + ".tmp" + path.suffix)
+
+
+def _walk_files(root: Path) -> List[Path]:
+    return [Path(r) / name for r, _, files in os.walk(root) for name in files]
+
+
+class InotifyWatcher:
+    """Recursive inotify watch; changes() returns (changed_files, removed_paths).
+
+    Sets degraded when a new directory cannot be watched (e.g. max_user_watches is
+    exhausted); the caller should switch to polling.
+    """
+
+    def __init__(self, root: Path):
+        if not sys.platform.startswith("linux"):
+            raise OSError("inotify is only available on Linux")
+        self._libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self.fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.root = root
+        self.dirs: Dict[int, Path] = {}
+        self.degraded = False
+        self._add_tree(root)
+
+    def _add_tree(self, top: Path):
+        for r, _, _ in os.walk(top):
+            wd = self._libc.inotify_add_watch(self.fd, os.fsencode(r), WATCH_MASK)
+            if wd < 0:
+                err = ctypes.get_errno()
+                if err == errno.ENOENT:
+                    continue  # removed again before we got to it
+                raise OSError(err, f"inotify_add_watch failed for {r}")
+            self.dirs[wd] = Path(r)
+
+    def changes(self, timeout: float) -> Tuple[Set[Path], Set[Path]]:
+        changed, removed = set(), set()
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return changed, removed
+        try:
+            buf = os.read(self.fd, 1 << 16)
+        except BlockingIOError:
+            return changed, removed
+        offset = 0
+        while offset < len(buf):
+            wd, mask, _, length = EVENT_HEADER.unpack_from(buf, offset)
+            offset += EVENT_HEADER.size
+            name = buf[offset:offset + length].rstrip(b"\0")
+            offset += length
+            if mask & IN_Q_OVERFLOW:
+                # Kernel dropped events: treat everything as possibly changed
+                changed.update(_walk_files(self.root))
+                continue
+            if mask & IN_IGNORED:
+                self.dirs.pop(wd, None)
+                continue
+            parent = self.dirs.get(wd)
+            if parent is None or not name:
+                continue
+            path = parent / os.fsdecode(name)
+            if mask & IN_ISDIR:
+                if mask & (IN_CREATE | IN_MOVED_TO):
+                    try:
+                        self._add_tree(path)
+                    except OSError:
+                        self.degraded = True
+                    changed.update(_walk_files(path))
+                elif mask & (IN_DELETE | IN_MOVED_FROM):
+                    removed.add(path)
+            elif mask & (IN_CLOSE_WRITE | IN_MOVED_TO):
+                changed.add(path)
+            elif mask & (IN_DELETE | IN_MOVED_FROM):
+                removed.add(path)
+        return changed, removed
+
+    def close(self):
+        os.close(self.fd)
+
+
+class PollingWatcher:
+    """Fallback for non-Linux systems and network filesystems (NFS/SMB), where inotify
+    never hears about changes made by other clients."""
+
+    def __init__(self, root: Path, interval: float = None):
+        self.root = root
+        self.interval = interval or POLL_INTERVAL
+        self.snapshot = self._snapshot()
+
+    def _snapshot(self) -> Dict[Path, Tuple[int, int]]:
+        snap = {}
+        for fp in _walk_files(self.root):
+            try:
+                st = fp.stat()
+            except OSError:
+                continue
+            snap[fp] = (st.st_mtime_ns, st.st_size)
+        return snap
+
+    def changes(self, timeout: float) -> Tuple[Set[Path], Set[Path]]:
+        time.sleep(min(timeout, self.interval))
+        new = self._snapshot()
+        changed = {p for p, sig in new.items() if self.snapshot.get(p) != sig}
+        removed = set(self.snapshot) - set(new)
+        self.snapshot = new
+        return changed, removed
+
+    def close(self):
+        pass
+
+
+def mount_fstype(path: Path) -> Optional[str]:
+    """Filesystem type of the mount holding path, from MOUNTS_FILE; None if unknown."""
+    try:
+        with open(MOUNTS_FILE, encoding="utf-8", errors="replace") as f:
+            mounts = [line.split() for line in f]
+    except OSError:
+        return None
+    target = str(Path(path).resolve())
+    best, fstype = None, None
+    for fields in mounts:
+        if len(fields) < 3:
+            continue
+        # Spaces and other specials in mount points are octal escapes (\040)
+        point = re.sub(r"\\([0-7]{3})", lambda m: chr(int(m.group(1), 8)), fields[1])
+        inside = target == point or target.startswith(point.rstrip("/") + "/")
+        if inside and (best is None or len(point) >= len(best)):
+            best, fstype = point, fields[2]
+    return fstype
+
+
+def make_watcher(root: Path):
+    if mount_fstype(root) in NETWORK_FILESYSTEMS:
+        return PollingWatcher(root)
+    try:
+        return InotifyWatcher(root)
+    except (OSError, AttributeError, TypeError):
+        return PollingWatcher(root)
+
+
+def _signature(path: Path):
+    st = path.stat()
+    return [st.st_mtime_ns, st.st_size]
+
+
+def _state_line(key: str, record: Optional[Dict]) -> str:
+    entry = {"path": key, "removed": True} if record is None else {"path": key, **record}
+    return json.dumps(entry, ensure_ascii=False) + "\n"
+
+
+def load_state(state_path: Path) -> Dict[str, Dict]:
+    """Replay the state journal: one {"path", "signature", "entries"} or {"path", "removed"} per line."""
+    state = {}
+    try:
+        with open(state_path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    rec = json.loads(line)
+                except ValueError:
+                    continue  # torn last line from a crash
+                if rec.get("removed"):
+                    state.pop(rec["path"], None)
+                elif "path" in rec:
+                    state[rec["path"]] = {"signature": rec.get("signature"), "entries": rec.get("entries", [])}
+    except OSError:
+        pass
+    return state
+
+
+def save_state(state: Dict[str, Dict], state_path: Path) -> None:
+    """Rewrite the journal with one line per live file."""
+    tmp = _tmp_path(state_path)
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.writelines(_state_line(key, state[key]) for key in sorted(state))
+    os.replace(tmp, state_path)
+
+
+def append_state(updates: Dict[str, Optional[Dict]], state_path: Path) -> None:
+    """Append changed (record) and removed (None) files to the journal."""
+    with open(state_path, "a", encoding="utf-8") as f:
+        f.writelines(_state_line(key, record) for key, record in updates.items())
+
+
+def apply_changes(state: Dict[str, Dict], changed: Set[Path], removed: Set[Path],
+                  updates: Dict[str, Optional[Dict]] = None) -> int:
+    """Rescan changed files and drop removed ones (or everything under a removed dir).
+
+    updates, when given, collects the new record (None when dropped) per touched key.
+    """
+    updates = {} if updates is None else updates
+    for gone in removed:
+        prefix = str(gone) + os.sep
+        for key in [k for k in state if k == str(gone) or k.startswith(prefix)]:
+            del state[key]
+            updates[key] = None
+    files = sorted(p for p in changed if p.is_file())
+    for fp, data in prefetch_files(files):
+        try:
+            sig = _signature(fp)
+            pairs = scan_entries(fp, data)
+        except Exception as e:
+            sig, pairs = None, [(fp, {"violations": [], "notes": [f"Scan failed: {e}"]})]
+        state[str(fp)] = updates[str(fp)] = {"signature": sig, "entries": [to_record(p, r) for p, r in pairs]}
+    return len(files)
+
+
+def stale_files(root: Path, state: Dict[str, Dict]) -> Tuple[Set[Path], Set[Path]]:
+    """Files that are new or changed since the state was saved, and ones that vanished."""
+    current = {str(fp): fp for fp in _walk_files(root)}
+    changed = set()
+    for key, fp in current.items():
+        try:
+            if state.get(key, {}).get("signature") != _signature(fp):
+                changed.add(fp)
+        except OSError:
+            continue
+    removed = {Path(k) for k in state if k not in current}
+    return changed, removed
+
+
+def write_full_report(state: Dict[str, Dict], report_path: Path) -> None:
+    pairs = [from_record(rec) for key in sorted(state) for rec in state[key]["entries"]]
+    tmp = _tmp_path(report_path)
+    write_report(pairs, tmp)
+    os.replace(tmp, report_path)
+
+
+def write_outputs(state: Dict[str, Dict], report_path: Path, state_path: Path) -> None:
+    write_full_report(state, report_path)
+    save_state(state, state_path)
+
+
+def watch_directory(root: Path, report_path: Path, state_path: Path,
+                    debounce: float = None, stop=None, watcher=None, report_interval: float = None) -> None:
+    """Keep report_path and state_path current for root until stop (a threading.Event) is set.
+
+    Each batch of changes costs a rescan of the changed files plus a journal append;
+    the full report is rewritten at most every report_interval seconds.
+    """
+    debounce = DEBOUNCE_SECONDS if debounce is None else debounce
+    report_interval = REPORT_INTERVAL if report_interval is None else report_interval
+    # Our own report/state (and their temp files) may live inside the watched tree
+    own_outputs = {p.resolve() for out in (report_path, state_path) for p in (out, _tmp_path(out))}
+
+    def relevant(paths):
+        return {p for p in paths if p.resolve() not in own_outputs}
+
+    watcher = watcher or make_watcher(root)
+    state = load_state(state_path)
+    changed, removed = stale_files(root, state)
+    count = apply_changes(state, relevant(changed), removed)
+    write_outputs(state, report_path, state_path)
+    print(f"[+] Watching {root} ({type(watcher).__name__}); initial sync rescanned {count} file(s).")
+    journal_lines, report_dirty, report_written = len(state), False, time.monotonic()
+
+    def flush_report(force=False):
+        nonlocal report_dirty, report_written
+        if report_dirty and (force or time.monotonic() - report_written >= report_interval):
+            write_full_report(state, report_path)
+            report_dirty, report_written = False, time.monotonic()
+            print(f"[+] Report updated: {report_path}")
+
+    try:
+        while not (stop and stop.is_set()):
+            if getattr(watcher, "degraded", False):
+                print("[!] inotify could not watch a new directory; switching to polling.")
+                watcher.close()
+                watcher = PollingWatcher(root)
+            changed, removed = watcher.changes(1.0)
+            changed, removed = relevant(changed), relevant(removed)
+            if not changed and not removed:
+                flush_report()
+                continue
+            # Debounce: keep absorbing events until the burst goes quiet
+            while not (stop and stop.is_set()):
+                more_changed, more_removed = watcher.changes(debounce)
+                more_changed, more_removed = relevant(more_changed), relevant(more_removed)
+                if not more_changed and not more_removed:
+                    break
+                changed |= more_changed
+                removed = (removed | more_removed) - more_changed
+            changed -= {p for p in changed if not p.exists()}
+            updates = {}
+            count = apply_changes(state, changed, removed, updates)
+            journal_lines += len(updates)
+            if journal_lines > 2 * len(state) + COMPACT_SLACK:
+                save_state(state, state_path)
+                journal_lines = len(state)
+            else:
+                append_state(updates, state_path)
+            report_dirty = True
+            print(f"[+] Rescanned {count} file(s), dropped {len(removed)}.")
+            flush_report()
+    finally:
+        flush_report(force=True)
+        watcher.close()
@@ -0,0 +1,86 @@
+# test_baseline.py
+from pathlib import Path
+import pytest
+from hrules import baseline, report
+
+
+def _pairs(*violations):
+    return [(Path("/docs/a.pdf"), {"violations": list(violations), "notes": []})]
+
+
+def test_fingerprint_ignores_whitespace_and_case():
+    a = baseline.fingerprint("/docs/a.pdf", "PDF low-contrast text on page 2: #cccccc on #ffffff ")
+    b = baseline.fingerprint("/docs/a.pdf", "pdf low-contrast text on page 2:  #CCCCCC on #FFFFFF")
+    assert a == b
+    assert a != baseline.fingerprint("/docs/a.pdf", "PDF low-contrast text on page 3: #cccccc on #ffffff ")
+    assert a != baseline.fingerprint("/docs/b.pdf", "PDF low-contrast text on page 2: #cccccc on #ffffff ")
+    # Aggregated counts may grow between runs without making the finding new
+    assert baseline.fingerprint("/docs/a.pdf", "DOCX low-contrast text: #cccccc on #ffffff (3 occurrences) ") == \
+        baseline.fingerprint("/docs/a.pdf", "DOCX low-contrast text: #cccccc on #ffffff (40 occurrences) ")
+
+
+def test_grouped_finding_keeps_identity_but_new_pages_are_new(tmp_path):
+    base = tmp_path / "base.json"
+    footer = "PDF image low-contrast text on pages 1-6: #cccccc on #ffffff (ratio 1.60) (6 occurrences) "
+    hidden = "PDF hidden text on page 2: invisible render mode (1 spans) "
+    report.write_json_report(_pairs(footer, hidden), base)
+
+    # Same groups, ratio re-estimated: unchanged
+    same = "PDF image low-contrast text on pages 1-6: #cccccc on #ffffff (ratio 1.55) (6 occurrences) "
+    assert baseline.diff_against_baseline(_pairs(same, hidden), base) == ([], [], 2)
+
+    # A hidden clause on a new page is new, and nothing was resolved
+    spread = "PDF hidden text on pages 2, 40: invisible render mode (2 spans) "
+    new, resolved, unchanged = baseline.diff_against_baseline(_pairs(same, spread), base)
+    assert new[0][1]["violations"] == ["NEW: " + spread]
+    assert (resolved, unchanged) == ([], 1)
+
+    # The footer dropping off pages 5-6 resolves the baseline line
+    shrunk = "PDF image low-contrast text on pages 1-4: #cccccc on #ffffff (ratio 1.60) (4 occurrences) "
+    new, resolved, unchanged = baseline.diff_against_baseline(_pairs(shrunk, hidden), base)
+    assert new == [] and resolved[0][1]["violations"] == ["RESOLVED: " + footer]
+
+    assert baseline.fingerprint("/docs/a.pdf", "PDF low-contrast text on pages 1-6: #e6e6e6 on #ffffff (6 occurrences) ") != \
+        baseline.fingerprint("/docs/a.pdf", "PDF low-contrast text on pages 1-6: #dddddd on #ffffff (6 occurrences) ")
+
+
+def test_finding_members():
+    assert baseline.finding_members("PDF low-contrast text on page 3: #aaaaaa on #ffffff ") == ["page 3"]
+    assert baseline.finding_members("PDF hidden text on pages 2-3, 9, +1 more: zero opacity (3 spans) ") == \
+        ["#0", "#1", "#2", "page 2", "page 3", "page 9", "more 0"]
+
+
+def test_ratio_counts_on_plain_lines(tmp_path):
+    base = tmp_path / "base.json"
+    report.write_json_report(_pairs("Low-contrast CSS .x (ratio 4.40) "), base)
+    new, resolved, unchanged = baseline.diff_against_baseline(_pairs("Low-contrast CSS .x (ratio 1.01) "), base)
+    assert len(new) == 1 and len(resolved) == 1 and unchanged == 0
+
+
+def test_repeated_findings_are_counted(tmp_path):
+    base = tmp_path / "base.json"
+    line = "DOCX low-contrast text: #cccccc on #ffffff"
+    report.write_json_report(_pairs(line), base)
+    new, resolved, unchanged = baseline.diff_against_baseline(_pairs(line, line), base)
+    assert unchanged == 1
+    assert new == [(Path("/docs/a.pdf"), {"violations": ["NEW: " + line], "notes": []})]
+    assert resolved == []
+
+
+def test_new_resolved_unchanged(tmp_path):
+    base = tmp_path / "base.json"
+    kept = "PDF low-contrast text on page 1: #dddddd on #ffffff "
+    fixed = "PDF hidden text on page 4: invisible render mode (2 spans) "
+    added = "PDF low-contrast text on page 5: #eeeeee on #ffffff "
+    report.write_json_report(_pairs(kept, fixed), base)
+    new, resolved, unchanged = baseline.diff_against_baseline(_pairs(kept, added), base)
+    assert unchanged == 1
+    assert new[0][1]["violations"] == ["NEW: " + added]
+    assert resolved[0][1]["violations"] == ["RESOLVED: " + fixed]
+
+
+def test_text_report_is_not_a_baseline(tmp_path):
+    base = tmp_path / "hrules_report.txt"
+    report.write_txt_report(_pairs("PDF low-contrast text on page 1: #dddddd on #ffffff "), base)
+    with pytest.raises(ValueError):
+        baseline.diff_against_baseline(_pairs(), base)
@@ -1,5 +1,7 @@
 # test_scanner.py
 import io
+import zipfile
+from email.message import EmailMessage
 from pathlib import Path
 from PIL import Image
 import pytest # for future tests
@@ -42,3 +44,368 @@ def test_scan_text_or_css(tmp_path):
     css_path.write_text("body { color:#000; background-color:#000; }")
     result = scanner.scan_text_or_css(css_path)
     assert any("Low-contrast" in v for v in result["violations"])
+
+
+def test_tile_boxes_cover_image_with_overlap():
+    boxes = scanner.tile_boxes(5000, 3000, 2048, 128)
+    assert boxes[0] == (0, 0, 2048, 2048)
+    assert max(b[2] for b in boxes) == 5000
+    assert max(b[3] for b in boxes) == 3000
+    assert all(b[2] - b[0] <= 2048 and b[3] - b[1] <= 2048 for b in boxes)
+
+
+def _fake_ocr_data(calls):
+    def fake_data(img, config="", output_type=None):
+        calls.append(img.size)
+        return {
+            "text": ["", "Salary", "clause", "shared", "footer", "line"], "conf": [-1, 95, 92, 90, 90, 90],
+            "left": [0, 5, 60, 5, 50, 90], "top": [0, 5, 5, 40, 40, 40], "width": [0, 50, 50, 40, 35, 30],
+            "height": [0, 20, 20, 20, 20, 20], "block_num": [1, 1, 1, 1, 1, 1], "par_num": [1, 1, 1, 1, 1, 1],
+            "line_num": [0, 1, 1, 2, 2, 2],
+        }
+    return fake_data
+
+
+# Words of a 300x200 page: (text, left, top, right, bottom)
+PAGE_WORDS = [("Salary", 5, 10, 55, 30), ("clause", 60, 10, 110, 30), ("continues", 150, 10, 240, 30),
+              ("here", 250, 10, 290, 30), ("shared", 5, 150, 45, 170), ("footer", 100, 150, 160, 170),
+              ("line", 200, 150, 240, 170)]
+
+
+def _fake_tile_ocr(tiles):
+    # OCR of the next tile (OCR_WORKERS=1): PAGE_WORDS inside it, clipped at its left/right edges
+    def fake_data(img, config="", output_type=None):
+        x0, y0, x1, y1 = tiles.pop(0)
+        data = {k: [] for k in ("text", "conf", "left", "top", "width", "height")}
+        for text, left, top, right, bottom in PAGE_WORDS:
+            lo, hi = max(left, x0), min(right, x1)
+            if top < y0 or bottom > y1 or lo >= hi:
+                continue
+            keep = -(-len(text) * (hi - lo) // (right - left))
+            data["text"].append(text[:keep] if left >= x0 else text[-keep:])
+            for k, v in (("conf", 90), ("left", lo - x0), ("top", top - y0), ("width", hi - lo),
+                         ("height", bottom - top)):
+                data[k].append(v)
+        return data
+    return fake_data
+
+
+def test_tiled_ocr_keeps_lines_whole(monkeypatch):
+    monkeypatch.setattr(scanner, "OCR_MAX_PIXELS", 10_000)
+    monkeypatch.setattr(scanner, "OCR_TILE_SIZE", 128)
+    monkeypatch.setattr(scanner, "OCR_WORKERS", 1)
+    tiles = scanner.tile_boxes(300, 200, 128, 64)
+    assert len(tiles) > 4
+    monkeypatch.setattr(scanner.pytesseract, "image_to_data", _fake_tile_ocr(list(tiles)))
+    buf = io.BytesIO()
+    Image.new("RGB", (300, 200), (255, 255, 255)).save(buf, format="PNG")
+    # Lines crossing tiles come out whole, without the clipped or repeated overlap readings
+    assert scanner.ocr_image_bytes(buf.getvalue()) == "Salary clause continues here\nshared footer line"
+
+
+def test_small_image_is_one_ocr_pass(monkeypatch):
+    calls = []
+    monkeypatch.setattr(scanner.pytesseract, "image_to_data", _fake_ocr_data(calls))
+    buf = io.BytesIO()
+    Image.new("RGB", (300, 200), (255, 255, 255)).save(buf, format="PNG")
+    assert scanner.ocr_image_bytes(buf.getvalue()) == "Salary clause\nshared footer line"
+    assert calls == [(300, 200)]
+
+
+def test_oversized_image_gets_a_note(tmp_path, monkeypatch):
+    assert Image.MAX_IMAGE_PIXELS == int(1024 * 1024 * 1024 // 4 // 3)  # Pillow's default, untouched
+    calls = []
+    monkeypatch.setattr(scanner.pytesseract, "image_to_data", _fake_ocr_data(calls))
+    img_path = tmp_path / "poster.png"
+    Image.new("RGB", (300, 200), (255, 255, 255)).save(img_path)
+    monkeypatch.setattr(Image, "MAX_IMAGE_PIXELS", 10_000)  # Pillow refuses anything over 20k pixels
+    monkeypatch.setattr(scanner, "IMAGE_MAX_PIXELS", 100_000)
+
+    # A file on disk may exceed Pillow's limit, up to IMAGE_MAX_PIXELS
+    result = scanner.scan_image(img_path)
+    assert calls and not any("too large" in n for n in result["notes"])
+    monkeypatch.setattr(scanner, "IMAGE_MAX_PIXELS", 50_000)
+    assert "Image too large to OCR (over 50,000 pixels)." in scanner.scan_image(img_path)["notes"]
+
+    # Archive members and uploads keep Pillow's limit
+    member = scanner.scan_image(Path("bundle.zip!/poster.png"), img_path.read_bytes())
+    assert "Image too large to OCR (over 20,000 pixels)." in member["notes"]
+    assert Image.MAX_IMAGE_PIXELS == 10_000
+
+
+def test_transparency_of_palette_image(tmp_path):
+    img = Image.new("P", (4, 1))
+    img.putpalette([255, 255, 255, 0, 0, 0] + [0] * 762)
+    img.putdata([0, 1, 1, 1])
+    img.save(tmp_path / "logo.png", transparency=0)
+    assert scanner.detect_transparency(tmp_path / "logo.png") == (True, 0.25)
+    Image.new("RGB", (4, 4)).save(tmp_path / "flat.png")
+    assert scanner.detect_transparency(tmp_path / "flat.png") == (False, 0.0)
+
+
+def test_scan_image_runs_ocr_once(tmp_path, monkeypatch):
+    calls = []
+    monkeypatch.setattr(scanner.pytesseract, "image_to_data", _fake_ocr_data(calls))
+    monkeypatch.setattr(scanner.pytesseract, "image_to_string", lambda *a, **k: 1 / 0)
+    img_path = tmp_path / "scan.png"
+    Image.new("RGB", (300, 200), (255, 255, 255)).save(img_path)
+
+    result = scanner.scan_image(img_path)
+    assert calls == [(300, 200)]
+    assert "Image OCR text: Salary clause shared footer line" in result["notes"]
+
+
+def _zip_bytes(members):
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w") as zf:
+        for name, data in members.items():
+            zf.writestr(name, data)
+    return buf.getvalue()
+
+
+def test_scan_zip_members_in_memory(tmp_path):
+    inner = _zip_bytes({"clause.txt": "Hidden\u200Bclause"})
+    bundle = tmp_path / "bundle.zip"
+    bundle.write_bytes(_zip_bytes({"docs/readme.txt": "plain text", "inner.zip": inner}))
+    pairs = dict(scanner.scan_entries(bundle))
+    assert pairs[Path(f"{bundle}!/docs/readme.txt")]["violations"] == []
+    nested = pairs[Path(f"{bundle}!/inner.zip!/clause.txt")]
+    assert any("zero-width" in v for v in nested["violations"])
+    flat = scanner.scan_file(bundle)
+    assert any(v.startswith(f"{bundle}!/inner.zip!/clause.txt: ") for v in flat["violations"])
+
+
+def test_scan_zip_limits(tmp_path, monkeypatch):
+    monkeypatch.setattr(scanner, "MAX_CONTAINER_MEMBERS", 1)
+    bundle = tmp_path / "bundle.zip"
+    bundle.write_bytes(_zip_bytes({"a.txt": "a", "b.txt": "b"}))
+    pairs = scanner.scan_entries(bundle)
+    assert pairs[0][0] == bundle
+    assert any("limit" in note for note in pairs[0][1]["notes"])
+    assert len(pairs) == 2
+
+
+def test_scan_eml_attachments(tmp_path):
+    msg = EmailMessage()
+    msg["Subject"] = "Offer"
+    msg.set_content("Welcome aboard")
+    msg.add_alternative('<p style="color:#777777; background-color:#888888;">fine print</p>', subtype="html")
+    msg.add_attachment(b"terms\xe2\x80\x8bhidden", maintype="text", subtype="plain", filename="terms.txt")
+    eml = tmp_path / "offer.eml"
+    eml.write_bytes(msg.as_bytes())
+    pairs = dict(scanner.scan_entries(eml))
+    terms = pairs[Path(f"{eml}!/terms.txt")]
+    assert any("zero-width" in v for v in terms["violations"])
+    assert any(p.suffix == ".html" for p in pairs)
+
+
+def test_prefetch_files_keeps_order_and_budget(tmp_path):
+    paths = []
+    for i in range(10):
+        fp = tmp_path / f"f{i}.txt"
+        fp.write_bytes(b"x" * (50 if i == 3 else 10) + bytes([i]))
+        paths.append(fp)
+    got = list(scanner.prefetch_files(paths, max_bytes=40, workers=2))
+    assert [p for p, _ in got] == paths
+    assert got[3][1] is None  # larger than the budget: scanner reads it itself
+    assert all(data == p.read_bytes() for p, data in got if p != paths[3])
+
+
+def test_prefetch_stats_on_workers_and_stops_cleanly(tmp_path, monkeypatch):
+    import threading
+    paths = []
+    for i in range(6):
+        fp = tmp_path / f"f{i}.txt"
+        fp.write_bytes(b"x" * 30)
+        paths.append(fp)
+    stat_threads = []
+    original = Path.stat
+    monkeypatch.setattr(Path, "stat", lambda self, **kw: (
+        stat_threads.append(threading.current_thread()) if self in paths else None) or original(self, **kw))
+
+    gen = scanner.prefetch_files(paths, max_bytes=40, workers=3)
+    assert next(gen) == (paths[0], b"x" * 30)
+    gen.close()  # later reads are blocked on the budget and must not hang shutdown
+    assert stat_threads and threading.main_thread() not in stat_threads
+
+
+def test_scan_directory_uses_prefetched_bytes(tmp_path):
+    (tmp_path / "a.txt").write_text("Hidden\u200bclause")
+    (tmp_path / "page.html").write_text('<p style="display:none">x</p>')
+    results = dict(scanner.scan_directory(tmp_path))
+    assert results[tmp_path / "a.txt"]["violations"]
+    assert any("Hidden CSS" in v for v in results[tmp_path / "page.html"]["violations"])
+
+
+def test_image_text_contrast_flags_faint_words(tmp_path, monkeypatch):
+    img = Image.new("RGB", (200, 60), (255, 255, 255))
+    img.paste((0, 0, 0), (20, 20, 60, 40))        # dark "word"
+    img.paste((220, 220, 220), (120, 20, 170, 40))  # faint grey "word"
+    img_path = tmp_path / "banner.png"
+    img.save(img_path)
+
+    def fake_data(image, config="", output_type=None):
+        return {
+            "text": ["Salary", "clause"], "conf": [95, 90],
+            "left": [15, 115], "top": [15, 15], "width": [50, 60], "height": [30, 30],
+            "block_num": [1, 1], "par_num": [1, 1], "line_num": [1, 1],
+        }
+
+    monkeypatch.setattr(scanner.pytesseract, "image_to_data", fake_data)
+    findings = scanner.detect_image_text_contrast(img_path)
+    assert [f["text"] for f in findings] == ["clause"]
+    assert findings[0]["fg"] == "#dcdcdc" and findings[0]["bg"] == "#ffffff"
+    assert findings[0]["ratio"] < scanner.CONTRAST_THRESHOLD
+
+    result = scanner.scan_image(img_path)
+    assert any("Image low-contrast text" in v for v in result["violations"])
+
+
+def _banded_pdf(path):
+    import fitz
+    doc = fitz.open()
+    page = doc.new_page()
+    page.draw_rect(fitz.Rect(0, 0, page.rect.width, 80), color=None, fill=(0, 0, 0))
+    page.insert_text((40, 50), "Company header", fontsize=14, color=(1, 1, 1))
+    page.draw_rect(fitz.Rect(30, 300, 400, 360), color=None, fill=(0.2, 0.2, 0.2))
+    page.insert_text((40, 335), "Waiver of claims", fontsize=14, color=(0, 0, 0))
+    doc.save(str(path))
+
+
+def test_pdf_background_sampling(tmp_path, monkeypatch):
+    pdf = tmp_path / "banded.pdf"
+    _banded_pdf(pdf)
+
+    flat = scanner.scan_pdf(pdf)
+    assert any("#ffffff on #ffffff" in v for v in flat["violations"])
+    assert not any("Waiver" in n for n in flat["notes"])
+
+    monkeypatch.setattr(scanner, "PDF_RASTER_BACKGROUND", True)
+    sampled = scanner.scan_pdf(pdf)
+    assert not any("Company header" in n for n in sampled["notes"])
+    assert any("Waiver of claims" in n for n in sampled["notes"])
+    assert any("#000000 on #333333" in v for v in sampled["violations"])
+
+
+def test_pdf_hidden_text_tricks(tmp_path):
+    import fitz
+    pdf = tmp_path / "tricks.pdf"
+    doc = fitz.open()
+    page = doc.new_page()
+    page.insert_text((50, 100), "Visible terms", fontsize=12)
+    page.insert_text((50, 150), "Invisible clause", fontsize=12, render_mode=3)
+    page.insert_text((50, 200), "Transparent clause", fontsize=12, fill_opacity=0)
+    page.insert_text((50, 250), "Tiny clause", fontsize=0.5)
+    page.insert_text((900, 250), "Offpage clause", fontsize=12)
+    page.insert_text((50, 300), "Covered clause", fontsize=12)
+    page.draw_rect(fitz.Rect(40, 285, 200, 305), color=None, fill=(1, 1, 1))
+    doc.save(str(pdf))
+
+    found = scanner.detect_pdf_hidden_text(fitz.open(str(pdf))[0])
+    assert found["invisible render mode"] == ["Invisible clause"]
+    assert found["zero opacity"] == ["Transparent clause"]
+    assert found["outside visible page area"] == ["Offpage clause"]
+    assert found["covered by filled shape"] == ["Covered clause"]
+    assert found["font size below 2pt"] == ["Tiny clause"]
+    assert not any("Visible terms" in texts for texts in found.values())
+
+    result = scanner.scan_pdf(pdf)
+    assert sum("PDF hidden text on page 1" in v for v in result["violations"]) == 5
+
+
+def test_pdf_hidden_text_on_rotated_page(tmp_path):
+    import fitz
+    pdf = tmp_path / "rotated.pdf"
+    doc = fitz.open()
+    page = doc.new_page(width=595, height=842)
+    page.insert_text((50, 800), "Bottom line", fontsize=12)
+    page.insert_text((900, 400), "Offpage clause", fontsize=12)
+    page.set_rotation(90)
+    doc.save(str(pdf))
+
+    found = scanner.detect_pdf_hidden_text(fitz.open(str(pdf))[0])
+    assert found == {"outside visible page area": ["Offpage clause"]}
+
+
+def test_pdf_images_are_extracted_once(tmp_path, monkeypatch):
+    import fitz
+    buf = io.BytesIO()
+    Image.new("RGB", (40, 40), (200, 0, 0)).save(buf, format="PNG")
+    pdf = tmp_path / "logo.pdf"
+    doc = fitz.open()
+    for _ in range(3):
+        doc.new_page().insert_image(fitz.Rect(10, 10, 50, 50), stream=buf.getvalue())
+    doc.save(str(pdf))
+
+    encodes = []
+    original = fitz.Pixmap.tobytes
+    monkeypatch.setattr(fitz.Pixmap, "tobytes", lambda self, *a, **k: encodes.append(1) or original(self, *a, **k))
+    scanner.scan_pdf(pdf)
+    assert len(encodes) == 1
+
+
+def test_format_pages(monkeypatch):
+    assert scanner.format_pages([3]) == "page 3"
+    assert scanner.format_pages([4, 1, 2, 3, 9]) == "pages 1-4, 9"
+    monkeypatch.setattr(scanner, "MAX_PAGE_RANGES", 2)
+    assert scanner.format_pages([1, 3, 5, 7]) == "pages 1, 3, +2 more"
+
+
+def test_pdf_findings_aggregate_by_colour_pair(tmp_path, monkeypatch):
+    import fitz
+    pdf = tmp_path / "footer.pdf"
+    doc = fitz.open()
+    for i in range(1, 7):
+        page = doc.new_page()
+        page.insert_text((50, 100), f"Body text {i}", fontsize=12)
+        page.insert_text((50, 800), f"Footer {i}", fontsize=8, color=(0.9, 0.9, 0.9))
+        page.insert_text((50, 780), f"Fine print {i}", fontsize=8, color=(0.9, 0.9, 0.9))
+    doc.save(str(pdf))
+
+    result = scanner.scan_pdf(pdf)
+    contrast = [v for v in result["violations"] if "low-contrast" in v]
+    assert contrast == ["PDF low-contrast text on pages 1-6: #e6e6e6 on #ffffff (12 occurrences) "]
+    excerpts = [n for n in result["notes"] if n.startswith("Excerpt")]
+    assert len(excerpts) == scanner.MAX_SAMPLES
+
+    monkeypatch.setattr(scanner, "DETAIL", "full")
+    full = scanner.scan_pdf(pdf)
+    assert sum("low-contrast" in v for v in full["violations"]) == 12
+
+
+def test_classify_violation():
+    assert scanner.classify_violation("DOCX hidden text runs: 2 ") == ("hidden_run", "high")
+    assert scanner.classify_violation("PDF low-contrast text on page 1: #aaaaaa on #ffffff ") == \
+        ("low_contrast", "medium")
+    assert scanner.classify_violation("Image transparency: 5.00% ") == ("transparency", "low")
+
+
+def test_run_checks_cheapest_first_and_fail_fast(monkeypatch):
+    order = []
+
+    def check(name, violation=None):
+        def run(v, n):
+            order.append(name)
+            if violation:
+                v.append(violation)
+        return name, run
+
+    checks = [check("ocr"), check("transparency", "Image transparency: 1.00% "),
+              check("zero_width", "TXT hidden/zero-width text: 1 ")]
+    scanner.run_checks(checks)
+    assert order == ["zero_width", "transparency", "ocr"]
+
+    order.clear()
+    monkeypatch.setattr(scanner, "FAIL_FAST_SEVERITY", "high")
+    res = scanner.run_checks(checks)
+    assert order == ["zero_width"]
+    assert any("Fail-fast" in n for n in res["notes"])
+
+
+def test_scan_directory_fail_fast_stops_run(tmp_path, monkeypatch):
+    for i in range(5):
+        (tmp_path / f"f{i}.txt").write_text("bad\u200b" if i == 0 else "fine")
+    monkeypatch.setattr(scanner, "FAIL_FAST_SEVERITY", "low")
+    results = scanner.scan_directory(tmp_path)
+    assert scanner.is_blocking(results[-1][1])
+    assert sum(1 for _, r in results if r["violations"]) == 1
@@ -0,0 +1,147 @@
+# test_service.py
+import http.client
+import json
+import os
+import signal
+import subprocess
+import sys
+import threading
+from pathlib import Path
+import pytest
+from hrules import service
+
+
+@pytest.fixture(scope="module")
+def scan_service():
+    svc = service.ScanService(workers=1)
+    yield svc
+    svc.close()
+
+
+def _serve(svc, **kwargs):
+    server = service.make_server(svc, **kwargs)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def test_scan_paths_over_tcp(scan_service, tmp_path):
+    doc = tmp_path / "offer.txt"
+    doc.write_text("hidden\u200bclause")
+    server = _serve(scan_service, port=0)
+    try:
+        pairs = service.scan_via_service([tmp_path], port=server.server_address[1], token=server.token)
+    finally:
+        server.shutdown()
+        server.server_close()
+    assert [p.name for p, _ in pairs] == ["offer.txt"]
+    assert any("zero-width" in v for v in pairs[0][1]["violations"])
+
+
+def test_upload_over_unix_socket(scan_service, tmp_path):
+    sock = str(tmp_path / "hrules.sock")
+    server = _serve(scan_service, socket_path=sock)
+    try:
+        conn = service._UnixConnection(sock, 30)
+        conn.request("POST", "/scan", body=b"a\xe2\x80\x8bb", headers={"X-Filename": "memo.txt"})
+        payload = json.loads(conn.getresponse().read())
+        conn.close()
+    finally:
+        server.shutdown()
+        server.server_close()
+    (record,) = payload["results"]
+    assert record["path"] == "upload!/memo.txt"
+    assert record["violations"]
+
+
+@pytest.mark.parametrize("length", ["-1", "abc"])
+def test_bad_content_length_is_rejected(scan_service, length):
+    server = _serve(scan_service, port=0)
+    try:
+        conn = http.client.HTTPConnection("127.0.0.1", server.server_address[1], timeout=30)
+        conn.putrequest("POST", "/scan")
+        conn.putheader("Content-Length", length)
+        conn.putheader("X-Filename", "memo.txt")
+        conn.putheader("Authorization", f"Bearer {server.token}")
+        conn.endheaders()
+        conn.send(b"x" * 5000)
+        assert conn.getresponse().status == 400
+        conn.close()
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_large_request_streams_through_small_queue(scan_service, tmp_path):
+    for i in range(40):
+        (tmp_path / f"doc{i:02}.txt").write_text("fine")
+    server = _serve(scan_service, port=0)
+    try:
+        pairs = service.scan_via_service([tmp_path], port=server.server_address[1], token=server.token)
+    finally:
+        server.shutdown()
+        server.server_close()
+    assert len(pairs) == 40
+
+
+def test_saturated_service_answers_503(scan_service, tmp_path, monkeypatch):
+    monkeypatch.setattr(service, "QUEUE_TIMEOUT", 0.1)
+    (tmp_path / "a.txt").write_text("fine")
+    server = _serve(scan_service, port=0)
+    original = scan_service.slots
+    scan_service.slots = threading.BoundedSemaphore(1)
+    scan_service.slots.acquire()
+    try:
+        conn = http.client.HTTPConnection("127.0.0.1", server.server_address[1], timeout=30)
+        conn.request("POST", "/scan", body=json.dumps({"paths": [str(tmp_path)]}),
+                     headers={"Authorization": f"Bearer {server.token}"})
+        resp = conn.getresponse()
+        assert resp.status == 503 and resp.getheader("Retry-After")
+        conn.close()
+    finally:
+        scan_service.slots = original
+        server.shutdown()
+        server.server_close()
+
+
+def test_tcp_requires_token_and_local_host(scan_service, tmp_path):
+    server = _serve(scan_service, port=0)
+    port = server.server_address[1]
+    body = json.dumps({"paths": [str(tmp_path)]})
+    try:
+        for headers in ({}, {"Authorization": "Bearer wrong"},
+                        {"Authorization": f"Bearer {server.token}", "Host": f"attacker.example:{port}"}):
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+            conn.request("POST", "/scan", body=body, headers=headers)
+            assert conn.getresponse().status == 403
+            conn.close()
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_service_replaces_a_dead_worker(tmp_path):
+    doc = tmp_path / "offer.txt"
+    doc.write_text("hidden\u200bclause")
+    svc = service.ScanService(workers=1)
+    try:
+        for pid in list(svc.pool._processes):
+            os.kill(pid, signal.SIGKILL)
+        try:
+            svc.submit([(str(doc), None)])  # may be lost with the dead worker
+        except service.BrokenProcessPool:
+            pass
+        assert svc.submit([(str(doc), None)])[0]["path"] == str(doc)
+        # No queue slot leaked by the failed submissions
+        assert svc.slots._value == svc.workers * service.PENDING_PER_WORKER
+    finally:
+        svc.close()
+
+
+def test_client_without_service_returns_none(tmp_path):
+    assert service.scan_via_service([tmp_path], socket_path=str(tmp_path / "missing.sock")) is None
+
+
+def test_client_does_not_import_the_scanner():
+    code = "import sys, hrules.cli; print('hrules.scanner' in sys.modules, 'fitz' in sys.modules)"
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout
+    assert out.split() == ["False", "False"]
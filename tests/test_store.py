@@ -0,0 +1,51 @@
+# test_store.py
+from pathlib import Path
+from hrules import store, report
+
+
+PAIRS = [
+    (Path("/contracts/a.docx"), {"violations": ["DOCX low-contrast text: #cccccc on #ffffff",
+                                                "DOCX hidden text runs: 2 "],
+                                 "notes": ["Excerpt: fine print"]}),
+    (Path("/contracts/b.pdf"), {"violations": ["PDF low-contrast text on page 1: #dddddd on #ffffff "],
+                                "notes": []}),
+    (Path("/offers/c.docx"), {"violations": ["DOCX low-contrast text: #eeeeee on #ffffff"], "notes": []}),
+]
+
+
+def test_query_filters(tmp_path):
+    conn = store.open_store(tmp_path / "r.db")
+    store.save_results(conn, PAIRS)
+    pairs = store.query_findings(conn, kind="low_contrast", file_type="docx", path_prefix="/contracts")
+    assert pairs == [(Path("/contracts/a.docx"), {"violations": ["DOCX low-contrast text: #cccccc on #ffffff"],
+                                                  "notes": []})]
+    high = store.query_findings(conn, severity="high", include_notes=True)
+    assert [p for p, _ in high] == [Path("/contracts/a.docx")]
+    assert high[0][1]["notes"] == ["Excerpt: fine print"]
+    assert dict(store.count_findings(conn)) == {"low_contrast": 3, "hidden_run": 1}
+    assert dict(store.count_findings(conn, "type", path_prefix="/offers")) == {".docx": 1}
+
+
+def test_path_prefix_stops_at_directory_boundary(tmp_path):
+    conn = store.open_store(tmp_path / "r.db")
+    store.save_results(conn, PAIRS + [
+        (Path("/contracts-old/d.docx"), {"violations": ["DOCX hidden text runs: 1 "], "notes": []})])
+    for prefix in ("/contracts", "/contracts/"):
+        assert [p for p, _ in store.query_findings(conn, path_prefix=prefix)] == \
+            [Path("/contracts/a.docx"), Path("/contracts/b.pdf")]
+    assert [p for p, _ in store.query_findings(conn, path_prefix="/contracts/a.docx")] == [Path("/contracts/a.docx")]
+
+
+def test_rescan_replaces_findings(tmp_path):
+    conn = store.open_store(tmp_path / "r.db")
+    store.save_results(conn, PAIRS)
+    store.save_results(conn, [(Path("/offers/c.docx"), {"violations": [], "notes": []})])
+    assert dict(store.count_findings(conn)) == {"low_contrast": 2, "hidden_run": 1}
+
+
+def test_export_json_round_trip(tmp_path):
+    conn = store.open_store(tmp_path / "r.db")
+    store.save_results(conn, PAIRS)
+    out = tmp_path / "subset.json"
+    report.write_report(store.query_findings(conn, file_type=".pdf"), out)
+    assert list(report.read_json_report(out)) == [PAIRS[1]]
@@ -0,0 +1,109 @@
+# test_watch.py
+import threading
+import time
+from pathlib import Path
+from hrules import watch
+
+
+def _wait_for(predicate, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.05)
+    return False
+
+
+def test_polling_watcher_reports_changes(tmp_path):
+    keep = tmp_path / "keep.txt"
+    gone = tmp_path / "gone.txt"
+    keep.write_text("a")
+    gone.write_text("b")
+    watcher = watch.PollingWatcher(tmp_path, interval=0.01)
+    keep.write_text("changed content")
+    gone.unlink()
+    (tmp_path / "new.txt").write_text("c")
+    changed, removed = watcher.changes(0.01)
+    assert changed == {keep, tmp_path / "new.txt"}
+    assert removed == {gone}
+
+
+def test_network_mounts_are_polled(tmp_path, monkeypatch):
+    share = tmp_path / "hr share"
+    share.mkdir()
+    mounts = tmp_path / "mounts"
+    point = str(share.resolve()).replace(" ", "\\040")  # as /proc/mounts escapes it
+    mounts.write_text(f"/dev/sda1 / ext4 rw 0 0\n//files/hr {point} cifs rw 0 0\n")
+    monkeypatch.setattr(watch, "MOUNTS_FILE", str(mounts))
+    assert watch.mount_fstype(share / "offers") == "cifs"
+    assert watch.mount_fstype(tmp_path) == "ext4"
+    assert isinstance(watch.make_watcher(share), watch.PollingWatcher)
+
+
+def test_apply_changes_and_stale_files(tmp_path):
+    docs = tmp_path / "docs"
+    (docs / "sub").mkdir(parents=True)
+    (docs / "sub" / "a.txt").write_text("zero\u200bwidth")
+    state = {}
+    changed, removed = watch.stale_files(docs, state)
+    assert watch.apply_changes(state, changed, removed) == 1
+    assert watch.stale_files(docs, state) == (set(), set())
+    watch.apply_changes(state, set(), {docs / "sub"})
+    assert state == {}
+
+
+def test_watch_directory_updates_report(tmp_path):
+    docs = tmp_path / "docs"
+    docs.mkdir()
+    report, state_path = docs / "report.txt", docs / "state.json"
+    stop = threading.Event()
+    worker = threading.Thread(target=watch.watch_directory, args=(docs, report, state_path),
+                              kwargs={"debounce": 0.1, "stop": stop, "report_interval": 0}, daemon=True)
+    worker.start()
+    try:
+        assert _wait_for(report.exists)
+        (docs / "offer.txt").write_text("hidden\u200bclause")
+        assert _wait_for(lambda: "offer.txt" in report.read_text())
+        assert "zero-width" in report.read_text()
+        assert str(docs / "offer.txt") in watch.load_state(state_path)
+    finally:
+        stop.set()
+        worker.join(5)
+
+
+def test_state_journal_appends_and_replays(tmp_path):
+    state_path = tmp_path / "state.json"
+    watch.save_state({"/d/a.txt": {"signature": [1, 2], "entries": []}}, state_path)
+    watch.append_state({"/d/b.txt": {"signature": [3, 4], "entries": []}, "/d/a.txt": None}, state_path)
+    with open(state_path, "a", encoding="utf-8") as f:
+        f.write('{"path": "/d/c.txt", "sig')  # torn write from a crash
+    assert watch.load_state(state_path) == {"/d/b.txt": {"signature": [3, 4], "entries": []}}
+
+
+def test_watch_switches_to_polling_when_inotify_degrades(tmp_path):
+    docs = tmp_path / "docs"
+    docs.mkdir()
+    stop = threading.Event()
+
+    class FailingWatcher:
+        degraded = True
+        closed = False
+
+        def changes(self, timeout):
+            raise AssertionError("degraded watcher must not be polled")
+
+        def close(self):
+            FailingWatcher.closed = True
+
+    worker = threading.Thread(target=watch.watch_directory, args=(docs, tmp_path / "r.txt", tmp_path / "s.json"),
+                              kwargs={"debounce": 0.1, "stop": stop, "watcher": FailingWatcher(),
+                                      "report_interval": 0}, daemon=True)
+    worker.start()
+    try:
+        assert _wait_for(lambda: FailingWatcher.closed)
+        (docs / "offer.txt").write_text("hidden\u200bclause")
+        assert _wait_for(lambda: "offer.txt" in (tmp_path / "r.txt").read_text())
+    finally:
+        stop.set()
+        worker.join(5)
+    assert not worker.is_alive()